@@ -0,0 +1,142 @@
+import numpy as np
+
+from anime_info import SEASONS
+from logger import get_logger
+from tier_config import SCORE_FIELDS, TIERS
+import metrics
+
+SCORE_COLUMNS = SCORE_FIELDS + ('total_score',)
+
+
+def _pearson(x, y):
+    # Column-wise Pearson correlation of every column of x against y, skipping
+    # rows where y is missing; columns with no spread come back as nan
+    mask = np.isfinite(y)
+    x, y = x[mask], y[mask]
+    if len(y) < 2:
+        return np.full(x.shape[1], np.nan)
+    xc = x - x.mean(axis=0)
+    yc = y - y.mean()
+    denom = np.sqrt((xc ** 2).sum(axis=0) * (yc ** 2).sum())
+    return np.divide(xc.T @ yc, denom, out=np.full(x.shape[1], np.nan), where=denom > 0)
+
+
+def _group_means(codes, groups, scores):
+    # Mean of every score column per group code in one bincount per column
+    counts = np.bincount(codes, minlength=groups)
+    sums = np.column_stack([np.bincount(codes, weights=scores[:, i], minlength=groups)
+                            for i in range(scores.shape[1])])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return counts, sums / counts[:, None]
+
+
+class RatingStats:
+    def __init__(self, database):
+        self.db = database
+        self.logger = get_logger(__name__)
+        self._token = None
+        self._stats = None
+
+    @metrics.timed('analytics', stage='load')
+    def _load(self):
+        conn = self.db.pool.connection()
+        cursor = conn.cursor()
+        cursor.row_factory = None  # plain tuples convert much faster than sqlite3.Row
+        # Tier and season come back as codes so every row is numeric and the whole
+        # result converts in one np.array call; NULLs become nan
+        tier_codes = ' '.join(f"WHEN '{tier}' THEN {i}" for i, tier in enumerate(TIERS))
+        season_codes = ' '.join(f"WHEN '{season}' THEN {i}" for i, season in enumerate(SEASONS))
+        # One read transaction, so a rating committed between the selects can't
+        # leave genre links pointing at rows that weren't read
+        cursor.execute('BEGIN')
+        try:
+            rows = cursor.execute(f'''
+            SELECT id, CASE tier {tier_codes} ELSE {len(TIERS)} END, CASE season {season_codes} ELSE {len(SEASONS)} END,
+                   score_v, score_mus, score_n, score_mem, total_score, mal_score, rank, popularity
+            FROM tier_list ORDER BY id
+            ''').fetchall()
+            if not rows:
+                return None
+            links = cursor.execute('SELECT tier_list_id, genre_id FROM tier_list_genres').fetchall()
+            names = dict(cursor.execute('SELECT id, name FROM genres').fetchall())
+        finally:
+            cursor.execute('COMMIT')
+
+        table = np.array(rows, dtype=np.float64)
+        ids = table[:, 0].astype(np.int64)
+        data = {
+            'tier': table[:, 1].astype(np.int64),
+            'season': table[:, 2].astype(np.int64),
+            'scores': table[:, 3:8],
+            'mal_score': table[:, 8],
+            'rank': table[:, 9],
+            'popularity': table[:, 10],
+        }
+
+        if links:
+            links = np.array(links, dtype=np.int64)
+            genre_ids, genre_codes = np.unique(links[:, 1], return_inverse=True)
+            data['genres'] = [names[genre_id] for genre_id in genre_ids.tolist()]
+            data['genre_code'] = genre_codes
+            data['genre_row'] = np.searchsorted(ids, links[:, 0])
+        return data
+
+    @metrics.timed('analytics', stage='compute')
+    def _compute(self, data):
+        scores = data['scores']
+        stats = {'count': len(scores)}
+
+        tier_counts = np.bincount(data['tier'], minlength=len(TIERS) + 1)[:len(TIERS)]
+        stats['tiers'] = {tier: (int(count), count / len(scores)) for tier, count in zip(TIERS, tier_counts)}
+        stats['means'] = dict(zip(SCORE_COLUMNS, scores.mean(axis=0)))
+
+        counts, means = _group_means(data['season'], len(SEASONS) + 1, scores)
+        stats['seasons'] = {season: (int(counts[i]), dict(zip(SCORE_COLUMNS, means[i])))
+                            for i, season in enumerate(SEASONS) if counts[i]}
+
+        stats['genres'] = {}
+        if 'genres' in data:
+            counts, means = _group_means(data['genre_code'], len(data['genres']), scores[data['genre_row']])
+            order = np.argsort(-means[:, -1])
+            stats['genres'] = {data['genres'][i]: (int(counts[i]), dict(zip(SCORE_COLUMNS, means[i])))
+                               for i in order if counts[i]}
+
+        stats['correlation'] = {
+            'mal_score': dict(zip(SCORE_COLUMNS, _pearson(scores, data['mal_score']))),
+            'rank': dict(zip(SCORE_COLUMNS, _pearson(scores, data['rank']))),
+            'popularity': dict(zip(SCORE_COLUMNS, _pearson(scores, data['popularity']))),
+        }
+        return stats
+
+    def stats(self):
+        # Recomputed only when the tier list changed since the last call
+        token = self.db.change_token()
+        if token != self._token:
+            data = self._load()
+            self._stats = self._compute(data) if data is not None else None
+            self._token = token
+            self.logger.debug("Recomputed rating statistics for token %s", token)
+        return self._stats
+
+
+def format_stats(stats):
+    if not stats:
+        return "No rated openings yet."
+
+    lines = [f"{stats['count']} rated openings", "", "Tier distribution"]
+    for tier, (count, share) in stats['tiers'].items():
+        lines.append(f"  {tier}  {count:>7}  {share:6.1%}")
+
+    header = f"  {'':<16}{'n':>7}" + ''.join(f"{column:>12}" for column in SCORE_COLUMNS)
+    lines += ["", "Mean scores", header,
+              f"  {'all':<16}{stats['count']:>7}" + ''.join(f"{stats['means'][c]:>12.2f}" for c in SCORE_COLUMNS)]
+    for title, groups in (("By season", stats['seasons']), ("By genre", stats['genres'])):
+        lines += ["", title, header]
+        for name, (count, means) in groups.items():
+            lines.append(f"  {name:<16.16}{count:>7}" + ''.join(f"{means[c]:>12.2f}" for c in SCORE_COLUMNS))
+
+    # Rank and popularity count down from 1, so a negative correlation means "scored higher when more popular"
+    lines += ["", "Correlation (Pearson)", f"  {'':<16}" + ''.join(f"{column:>12}" for column in SCORE_COLUMNS)]
+    for target, values in stats['correlation'].items():
+        lines.append(f"  {target:<16}" + ''.join(f"{values[c]:>12.3f}" for c in SCORE_COLUMNS))
+    return '\n'.join(lines)
@@ -0,0 +1,89 @@
+import re
+import sys
+from typing import NamedTuple
+
+# Strips "(eps 1-12)" style notes and the leading "#1: " numbering from MAL opening text
+OPENING_NOISE = re.compile(r'\([^()]*\)|#.*?: ')
+# MAL start_season.season values, in calendar order
+SEASONS = ("winter", "spring", "summer", "fall")
+
+
+def normalize_opening(text):
+    return OPENING_NOISE.sub('', text)
+
+
+class Opening(NamedTuple):
+    id: int
+    text: str
+    title: str  # normalized text, the key stored as tier_list.song_title
+
+
+class AnimeInfo:
+    # Only the fields the app reads survive loading; everything else in the
+    # MAL response is dropped so thousands of records stay small in memory
+    __slots__ = ('id', 'title', 'mean', 'rank', 'popularity', 'genres', 'season', 'year', 'openings')
+
+    def __init__(self, id, title, mean=None, rank=None, popularity=None, genres=(), season=None, year=None,
+                 openings=()):
+        self.id = id
+        self.title = title
+        self.mean = mean
+        self.rank = rank
+        self.popularity = popularity
+        self.genres = genres
+        self.season = season
+        self.year = year
+        self.openings = openings
+
+    @classmethod
+    def from_dict(cls, info):
+        start_season = info.get('start_season') or {}
+        season = start_season.get('season')
+        return cls(
+            id=info['id'],
+            title=info['title'],
+            mean=info.get('mean'),
+            rank=info.get('rank'),
+            popularity=info.get('popularity'),
+            # A few dozen genre and season names are shared by every record
+            genres=tuple(sys.intern(genre['name']) for genre in info.get('genres', ())),
+            season=sys.intern(season) if season else None,
+            year=start_season.get('year'),
+            openings=tuple(Opening(opening.get('id'), opening['text'], normalize_opening(opening['text']))
+                           for opening in info.get('opening_themes', ())),
+        )
+
+    @property
+    def start_season(self):
+        return f"{self.season}, {self.year}"
+
+    def matches(self, genres=(), season=None, year_from=None, year_to=None):
+        # The same conditions db.find_filtered applies to rated rows
+        if season is not None and self.season != season:
+            return False
+        if year_from is not None and (self.year is None or self.year < year_from):
+            return False
+        if year_to is not None and (self.year is None or self.year > year_to):
+            return False
+        return all(genre in self.genres for genre in genres)
+
+    def __repr__(self):
+        return (f"AnimeInfo(id={self.id}, title={self.title!r}, mean={self.mean}, rank={self.rank}, "
+                f"popularity={self.popularity}, genres={self.genres}, season={self.start_season!r}, "
+                f"openings={len(self.openings)})")
+
+
+class OpeningIndex:
+    def __init__(self):
+        self._by_title = {}
+
+    def add(self, info):
+        for opening in info.openings:
+            # song_title is UNIQUE in tier_list, so the first show to use a title owns it
+            self._by_title.setdefault(opening.title, (info.id, opening))
+
+    def get(self, title):
+        return self._by_title.get(title)
+
+    def __len__(self):
+        return len(self._by_title)
@@ -0,0 +1,40 @@
+import argparse
+import gc
+import json
+import tracemalloc
+
+from anime_info import AnimeInfo
+from benchmarks.synthetic import make_info_dict
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    records = build()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return records, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memory held by raw MAL dicts versus AnimeInfo records')
+    parser.add_argument('-n', type=int, default=10000, help='number of anime')
+    parser.add_argument('--openings', type=int, default=3, help='openings per anime')
+    args = parser.parse_args()
+
+    # Serialized once so both variants decode from the same text, like get_info does
+    raw = {anime_id: json.dumps(info) for anime_id, info in make_info_dict(args.n, args.openings).items()}
+
+    dicts, dict_bytes = measure(lambda: {anime_id: json.loads(text) for anime_id, text in raw.items()})
+    del dicts
+    slotted, slotted_bytes = measure(
+        lambda: {anime_id: AnimeInfo.from_dict(json.loads(text)) for anime_id, text in raw.items()})
+
+    print(f'{args.n} anime, {args.openings} openings each')
+    print(f'dict       {dict_bytes / 1024 / 1024:8.2f} MiB  {dict_bytes / args.n:8.0f} B/anime')
+    print(f'AnimeInfo  {slotted_bytes / 1024 / 1024:8.2f} MiB  {slotted_bytes / args.n:8.0f} B/anime')
+    print(f'reduction  {1 - slotted_bytes / dict_bytes:8.1%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+import argparse
+import logging
+import os
+import sqlite3
+import tempfile
+from time import perf_counter
+
+from anime_info import AnimeInfo
+from db_ops import db
+
+INFO = AnimeInfo.from_dict({
+    'id': 1,
+    'title': 'Benchmark Show',
+    'mean': 8.5,
+    'rank': 100,
+    'popularity': 200,
+    'genres': [{'name': 'Action'}, {'name': 'Drama'}],
+    'start_season': {'season': 'spring', 'year': 2015},
+})
+
+
+def create_legacy(db_name):
+    # The baseline schema, created without db() so the file keeps SQLite's default
+    # rollback journal instead of the WAL mode db() switches on
+    conn = sqlite3.connect(db_name)
+    try:
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS tier_list (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        song_title TEXT UNIQUE,
+        show_title TEXT,
+        a_id INTEGER,
+        mal_score REAL,
+        rank INTEGER,
+        popularity INTEGER,
+        genres TEXT,
+        start_season TEXT,
+        tier TEXT,
+        score_v INTEGER,
+        score_mus INTEGER,
+        score_n INTEGER,
+        score_mem INTEGER)
+        ''')
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def connect_per_call_lookup(db_name, name):
+    # Mirrors the original db.find_if_exists: one connection per statement
+    conn = sqlite3.connect(db_name)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT * FROM tier_list WHERE song_title = ?', (name,))
+        return cursor.fetchone() is not None
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def connect_per_call_insert(db_name, title, scores):
+    conn = sqlite3.connect(db_name)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+        INSERT INTO tier_list (song_title, show_title, a_id, mal_score, rank, popularity, genres, start_season, tier, score_v, score_mus, score_n, score_mem)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (title, INFO.title, INFO.id, INFO.mean, INFO.rank, INFO.popularity,
+              "['Action', 'Drama']", 'spring, 2015', 'A', *scores))
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def timed(label, func, n):
+    start = perf_counter()
+    for i in range(n):
+        func(i)
+    elapsed = perf_counter() - start
+    print(f'{label:<32} {n:>6} ops  {elapsed:8.3f}s  {n / elapsed:10.0f} ops/s')
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare connect-per-call with the pooled connection manager')
+    parser.add_argument('-n', type=int, default=2000, help='operations per scenario')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, 'legacy.db')
+        pooled_path = os.path.join(tmp, 'pooled.db')
+        create_legacy(legacy_path)
+        pooled = db(pooled_path)
+        # The per-call logging would otherwise dominate both paths
+        logging.getLogger('db_ops').setLevel(logging.WARNING)
+
+        scores = [8, 8, 8, 8]
+        legacy_insert = timed('insert (connect per call)', lambda i: connect_per_call_insert(legacy_path, f'op {i}', scores), args.n)
+        pooled_insert = timed('insert (pooled)', lambda i: pooled.insert_data(f'op {i}', INFO, scores), args.n)
+
+        legacy_lookup = timed('lookup (connect per call)', lambda i: connect_per_call_lookup(legacy_path, f'op {i}'), args.n)
+        pooled_lookup = timed('lookup (pooled)', lambda i: pooled.find_if_exists(f'op {i}'), args.n)
+
+        print(f'\ninsert speedup: {legacy_insert / pooled_insert:.1f}x')
+        print(f'lookup speedup: {legacy_lookup / pooled_lookup:.1f}x')
+        pooled.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+
+from benchmarks.synthetic import make_info_dict
+
+
+def rss_kib():
+    # Current resident set size; falls back to the peak where /proc is unavailable
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_variant(variant, responses_dir, n, lookups):
+    from info_store import InfoStore
+
+    logging.getLogger('info_store').setLevel(logging.WARNING)
+    ids = random.Random(1).sample(range(1, n + 1), lookups)
+    before = rss_kib()
+    start = perf_counter()
+
+    if variant == 'json':
+        # The previous cache_info/get_info path
+        with open(os.path.join(responses_dir, 'info.json'), 'r', encoding='utf-8') as f:
+            info_dict = json.load(f)
+        loaded = perf_counter()
+        for anime_id in ids:
+            info_dict[str(anime_id)]
+    else:
+        store = InfoStore(os.path.join(responses_dir, 'info.db'))
+        len(store)
+        loaded = perf_counter()
+        for anime_id in ids:
+            store.get(anime_id)
+
+    done = perf_counter()
+    print(json.dumps({'variant': variant, 'startup_s': loaded - start, 'lookups_s': done - loaded,
+                      'rss_delta_kib': rss_kib() - before}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare info.json with the indexed info store')
+    parser.add_argument('-n', type=int, default=10000, help='number of anime')
+    parser.add_argument('--lookups', type=int, default=200, help='get_info calls after startup')
+    parser.add_argument('--variant', choices=('json', 'store'), help=argparse.SUPPRESS)
+    parser.add_argument('--dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        run_variant(args.variant, args.dir, args.n, args.lookups)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        info_json_path = os.path.join(tmp, 'info.json')
+        with open(info_json_path, 'w', encoding='utf-8') as f:
+            json.dump(make_info_dict(args.n), f, ensure_ascii=False, indent=2)
+
+        from info_store import InfoStore
+        store = InfoStore(os.path.join(tmp, 'info.db'))
+        start = perf_counter()
+        store.import_json(info_json_path)
+        print(f'one-time import of {args.n} records: {perf_counter() - start:.2f}s')
+        os.replace(f'{info_json_path}.imported', info_json_path)
+        store.close()
+
+        # Each variant runs in a fresh interpreter so RSS is not shared
+        for variant in ('json', 'store'):
+            out = subprocess.run([sys.executable, '-m', 'benchmarks.bench_info_store', '--variant', variant,
+                                  '--dir', tmp, '-n', str(args.n), '--lookups', str(args.lookups)],
+                                 capture_output=True, text=True, check=True).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+            print(f"{variant:<6} startup {result['startup_s'] * 1000:8.1f} ms  "
+                  f"{args.lookups} lookups {result['lookups_s'] * 1000:7.1f} ms  "
+                  f"RSS +{result['rss_delta_kib'] / 1024:6.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
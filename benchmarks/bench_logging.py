@@ -0,0 +1,65 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+
+STYLES = ('fstring', 'lazy')
+
+
+def run_mode(n, style):
+    import logger
+
+    log = logger.get_logger('bench_logging')
+    db_name = 'app.db'
+
+    start = perf_counter()
+    if style == 'fstring':
+        # The original hot-path style: f-strings rendered on the calling thread
+        for i in range(n):
+            log.debug(f"Checking if opening {i} exists in database: {db_name}")
+            log.debug(f"opening {i} does not exist in database")
+    else:
+        for i in range(n):
+            log.debug("Checking if opening %s exists in database: %s", i, db_name)
+            log.debug("opening %s does not exist in database", i)
+    elapsed = perf_counter() - start
+
+    start = perf_counter()
+    logger.shutdown()
+    drain = perf_counter() - start
+    print(json.dumps({'elapsed': elapsed, 'drain': drain}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Main-thread cost of logging in sync and async mode')
+    parser.add_argument('-n', type=int, default=20000, help='find_if_exists-style call pairs')
+    parser.add_argument('--child', choices=STYLES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_mode(args.n, args.child)
+        return
+
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    calls = 2 * args.n
+    for mode in ('sync', 'async'):
+        # Every mode and style runs in its own fresh interpreter and log directory,
+        # so one loop is never timed while the listener still drains another's backlog
+        results = {}
+        for style in STYLES:
+            with tempfile.TemporaryDirectory() as tmp:
+                env = dict(os.environ, TIERLIST_LOG_MODE=mode, PYTHONPATH=package_root)
+                out = subprocess.run([sys.executable, '-m', 'benchmarks.bench_logging', '--child', style,
+                                      '-n', str(args.n)],
+                                     cwd=tmp, env=env, capture_output=True, text=True, check=True).stdout
+                results[style] = json.loads(out.strip().splitlines()[-1])
+        print(f"{mode:<6} " + '  '.join(
+            f"{label} {results[style]['elapsed'] / calls * 1e6:6.2f} us/call "
+            f"(drain {results[style]['drain'] * 1000:.1f} ms)"
+            for style, label in zip(STYLES, ('f-string', '%-style'))))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.synthetic import cover_bytes
+from image_downloader import ImageDownloader
+from mal_request import build_session
+
+
+class CoverHandler(BaseHTTPRequestHandler):
+    # /ok/<id>.jpg always serves a cover, /flaky/<id>.jpg fails with 503 on the
+    # first request for each id, /missing/<id>.jpg is a 404
+    content = b''
+    seen = set()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        kind = self.path.split('/')[1]
+        if kind == 'flaky':
+            with self.lock:
+                first = self.path not in self.seen
+                self.seen.add(self.path)
+            if first:
+                self.send_error(503)
+                return
+        if kind == 'missing':
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(self.content)))
+        self.end_headers()
+        self.wfile.write(self.content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run ImageDownloader against a local stand-in for the MAL CDN')
+    parser.add_argument('-n', type=int, default=60, help='covers per kind of endpoint')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=200.0, help='token-bucket rate in requests/s')
+    args = parser.parse_args()
+
+    CoverHandler.content = cover_bytes()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CoverHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+
+    jobs = [(f'{kind}-{i}', f'{base}/{kind}/{i}.jpg') for kind in ('ok', 'flaky', 'missing') for i in range(args.n)]
+    saved = []
+    try:
+        with tempfile.TemporaryDirectory() as images_dir:
+            # The status-retry adapter is turned off so retries come from ImageDownloader alone
+            downloader = ImageDownloader(images_dir, workers=args.workers, rate=args.rate, retries=2, backoff=0.01,
+                                         session=build_session(pool_size=args.workers, retries=0),
+                                         on_saved=saved.append)
+            report = downloader.download(jobs)
+            on_disk = sorted(os.listdir(images_dir))
+
+            # After a cancel, jobs that haven't started are skipped quietly rather than failed
+            cancelled = threading.Event()
+            cancelled.set()
+            downloader.cancelled = cancelled
+            cancelled_report = downloader.download(jobs)
+    finally:
+        server.shutdown()
+
+    print(report)
+    expected = sorted(f'{anime_id}.jpg' for anime_id, _ in jobs if not anime_id.startswith('missing'))
+    assert on_disk == expected, 'covers on disk do not match the successful jobs'
+    assert sorted(report.failed) == sorted(anime_id for anime_id, _ in jobs if anime_id.startswith('missing'))
+    assert len(saved) == len(report.downloaded) == 2 * args.n
+    assert report.bytes == len(CoverHandler.content) * 2 * args.n
+    print(cancelled_report)
+    assert len(cancelled_report.cancelled) == len(jobs) and not cancelled_report.failed
+    print('ok')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import sys
+import types
+
+
+class StubWidget:
+    # Accepts any constructor arguments and turns every widget call into a no-op,
+    # so frame code can run without a display. Geometry queries report a fixed size.
+    width = 1280
+    height = 180
+
+    def __init__(self, *args, **kwargs):
+        self._options = dict(kwargs)
+        self._value = kwargs.get('value')
+
+    def configure(self, **kwargs):
+        self._options.update(kwargs)
+
+    config = configure
+
+    def cget(self, key):
+        return self._options.get(key)
+
+    def winfo_width(self):
+        return self.width
+
+    def winfo_height(self):
+        return self.height
+
+    def winfo_children(self):
+        return []
+
+    def canvasx(self, x):
+        return x
+
+    def canvasy(self, y):
+        return y
+
+    def create_window(self, *args, **kwargs):
+        return id(object())
+
+    def get(self):
+        return self._value
+
+    def set(self, *args):
+        if len(args) == 1:
+            self._value = args[0]
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def install():
+    # Must run before anything imports tkinter or customtkinter
+    tk = types.ModuleType('tkinter')
+    for name in ('Tk', 'Canvas', 'Scrollbar', 'Frame', 'StringVar', 'IntVar'):
+        setattr(tk, name, type(name, (StubWidget,), {}))
+    tk.messagebox = types.SimpleNamespace(showerror=lambda *args, **kwargs: None)
+
+    ctk = types.ModuleType('customtkinter')
+    for name in ('CTk', 'CTkFrame', 'CTkScrollableFrame', 'CTkButton', 'CTkLabel', 'CTkToplevel',
+                 'CTkOptionMenu', 'CTkProgressBar', 'CTkImage', 'CTkEntry',
+                 'CTkTextbox'):
+        setattr(ctk, name, type(name, (StubWidget,), {}))
+
+    sys.modules['tkinter'] = tk
+    sys.modules['customtkinter'] = ctk
@@ -0,0 +1,155 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+
+DEFAULT_SIZES = (100, 1000, 10000)
+SEARCHES = ("opening", "synthetic anime 1", "artist 2", "action")
+
+
+def timed(results, name, func):
+    start = perf_counter()
+    func()
+    results[name] = perf_counter() - start
+
+
+def run_size(n, openings, headless):
+    # Runs inside a fresh interpreter whose working directory is a synthetic workspace
+    if headless:
+        from benchmarks import headless as stubs
+        stubs.install()
+
+    import tierlist_app
+    from mal_request import MALClient
+    from tier_config import TIERS
+
+    for name in ('db_ops', 'mal_request', 'info_store', 'thumbnails', 'tierlist_app'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    db, client = tierlist_app.db, tierlist_app.client
+    results = {}
+
+    with open('Responses/mal_list.json', 'r', encoding='utf-8') as f:
+        mal_list = json.load(f)
+    timed(results, 'hash_list', lambda: MALClient.hash_list(mal_list))
+
+    timed(results, 'import_info_json', client.import_legacy_info)
+    timed(results, 'cache_info', client.cache_info)
+    client._info_dict.clear()
+    timed(results, 'filter_facets', lambda: (client.info_store.genre_names(), client.info_store.years()))
+    timed(results, 'get_info_cold', lambda: [client.get_info(anime_id) for anime_id in range(1, n + 1)])
+    timed(results, 'get_info_warm', lambda: [client.get_info(anime_id) for anime_id in range(1, n + 1)])
+
+    # Rate the first opening of every anime; the rest stay in the unrated pool
+    infos = [client.get_info(anime_id) for anime_id in range(1, n + 1)]
+    scores = [(anime_id * 7 % 10) + 1 for anime_id in range(4)]
+    timed(results, 'insert_data', lambda: [db.insert_data(info.openings[0].title, info, scores) for info in infos])
+    timed(results, 'find_if_exists', lambda: [db.find_if_exists(info.openings[0].title) for info in infos])
+    timed(results, 'find_tier', lambda: [db.find_tier(tier) for tier in TIERS for _ in range(10)])
+    timed(results, 'index_openings', lambda: db.index_openings(infos))
+    timed(results, 'search', lambda: [db.search(text) for text in SEARCHES])
+
+    from analytics import RatingStats
+    timed(results, 'analytics', RatingStats(db).stats)
+
+    root = tierlist_app.ctk.CTk()
+    if not headless:
+        root.withdraw()
+
+    def render_top():
+        for tier in TIERS:
+            tierlist_app.TopButtonFrame(root, tier, "#446d92")
+        root.update_idletasks()
+
+    def render_bottom():
+        tierlist_app.BottomFrame(root)
+        root.update_idletasks()
+
+    timed(results, 'render_top_cold', render_top)
+    timed(results, 'render_top_warm', render_top)
+    timed(results, 'render_bottom', render_bottom)
+    return results
+
+
+def run_in_subprocess(n, openings, headless):
+    from benchmarks.synthetic import write_workspace
+
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as workspace:
+        write_workspace(workspace, n, openings)
+        cmd = [sys.executable, '-m', 'benchmarks.run', '--child', str(n), '--openings', str(openings)]
+        if headless:
+            cmd.append('--headless')
+        env = dict(os.environ, PYTHONPATH=package_root)
+        out = subprocess.run(cmd, cwd=workspace, env=env, capture_output=True, text=True)
+        if out.returncode:
+            sys.stderr.write(out.stderr)
+            raise RuntimeError(f'benchmark for {n} anime failed')
+        return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for size, stages in results['sizes'].items():
+        for stage, seconds in stages.items():
+            before = baseline.get('sizes', {}).get(size, {}).get(stage)
+            if not before:
+                continue
+            change = seconds / before - 1
+            marker = ''
+            if change > threshold:
+                marker = '  REGRESSION'
+                regressions.append((size, stage, change))
+            print(f'{size:>6} {stage:<18} {before * 1000:10.2f} ms -> {seconds * 1000:10.2f} ms  {change:+7.1%}{marker}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the sync, DB and render hot paths on synthetic data')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='anime counts to run')
+    parser.add_argument('--openings', type=int, default=3, help='openings per anime')
+    parser.add_argument('--headless', action='store_true',
+                        help='stub out tkinter/customtkinter (default when no DISPLAY is set)')
+    parser.add_argument('--output', default='benchmarks/results.json', help='where to write this run')
+    parser.add_argument('--baseline', help='earlier results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='slowdown reported as a regression')
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    headless = args.headless or not os.environ.get('DISPLAY')
+
+    if args.child:
+        print(json.dumps(run_size(args.child, args.openings, headless)))
+        return
+
+    results = {
+        'meta': {'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version,
+                 'platform': platform.platform(), 'openings': args.openings, 'headless': headless},
+        'sizes': {},
+    }
+    for n in args.sizes:
+        print(f'running {n} anime...', flush=True)
+        stages = run_in_subprocess(n, args.openings, headless)
+        results['sizes'][str(n)] = stages
+        for stage, seconds in stages.items():
+            print(f'  {stage:<18} {seconds * 1000:10.2f} ms')
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f'results written to {args.output}')
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import random
+
+GENRES = ('Action', 'Adventure', 'Comedy', 'Drama', 'Fantasy', 'Mystery', 'Romance', 'Sci-Fi',
+          'Slice of Life', 'Sports', 'Supernatural', 'Suspense')
+SEASONS = ('winter', 'spring', 'summer', 'fall')
+
+
+def make_info(anime_id, openings=3, rng=random):
+    # Shaped like an anime_info_query response, including fields the app never reads
+    return {
+        'id': anime_id,
+        'title': f'Synthetic Anime {anime_id}',
+        'main_picture': {
+            'medium': f'https://cdn.example.invalid/images/anime/{anime_id}m.jpg',
+            'large': f'https://cdn.example.invalid/images/anime/{anime_id}l.jpg',
+        },
+        'mean': round(rng.uniform(5.0, 9.5), 2),
+        'rank': rng.randint(1, 20000),
+        'popularity': rng.randint(1, 20000),
+        'genres': [{'id': i, 'name': name} for i, name in enumerate(rng.sample(GENRES, 3))],
+        'start_season': {'season': rng.choice(SEASONS), 'year': rng.randint(1990, 2025)},
+        'opening_themes': [
+            {'id': anime_id * 100 + n, 'anime_id': anime_id,
+             'text': f'#{n + 1}: "Opening {n + 1} of {anime_id}" by Artist {anime_id % 97} (eps 1-12)'}
+            for n in range(openings)
+        ],
+    }
+
+
+def make_info_dict(n, openings=3, seed=0):
+    rng = random.Random(seed)
+    return {str(anime_id): make_info(anime_id, openings, rng) for anime_id in range(1, n + 1)}
+
+
+def make_mal_list(n):
+    return {'data': [
+        {'node': {'id': anime_id, 'title': f'Synthetic Anime {anime_id}',
+                  'main_picture': {'medium': f'https://cdn.example.invalid/images/anime/{anime_id}m.jpg',
+                                   'large': f'https://cdn.example.invalid/images/anime/{anime_id}l.jpg'}},
+         'list_status': {'status': 'completed', 'updated_at': f'2024-01-01T00:00:{anime_id % 60:02d}+00:00'}}
+        for anime_id in range(1, n + 1)
+    ]}
+
+
+def cover_bytes(size=(225, 318)):
+    from io import BytesIO
+    from PIL import Image
+
+    # Noise rather than a flat color so JPEG decode cost resembles a real cover
+    image = Image.effect_noise(size, 64).convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def write_workspace(root, n, openings=3, images=True, seed=0):
+    # Lays out Responses/ and images/ the way the app expects to find them in its working directory
+    import json
+    import os
+
+    responses_dir = os.path.join(root, 'Responses')
+    images_dir = os.path.join(root, 'images')
+    os.makedirs(responses_dir, exist_ok=True)
+    os.makedirs(images_dir, exist_ok=True)
+
+    with open(os.path.join(responses_dir, 'mal_list.json'), 'w', encoding='utf-8') as f:
+        json.dump(make_mal_list(n), f)
+    with open(os.path.join(responses_dir, 'info.json'), 'w', encoding='utf-8') as f:
+        json.dump(make_info_dict(n, openings, seed), f, ensure_ascii=False, indent=2)
+
+    if images:
+        content = cover_bytes()
+        for anime_id in range(1, n + 1):
+            with open(os.path.join(images_dir, f'{anime_id}.jpg'), 'wb') as f:
+                f.write(content)
@@ -0,0 +1,170 @@
+import argparse
+import csv
+import json
+import os
+from time import perf_counter
+
+from anime_info import normalize_opening
+from db_ops import db as Database
+from logger import get_logger
+from tier_config import SCORE_FIELDS, TierConfig
+import metrics
+
+EXPORT_FIELDS = ('song_title', 'show_title', 'a_id') + SCORE_FIELDS + ('total_score', 'tier')
+FORMATS = ('csv', 'json', 'ndjson')
+
+logger = get_logger(__name__)
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    ext = os.path.splitext(path)[1].lower().lstrip('.')
+    if ext == 'jsonl':
+        return 'ndjson'
+    if ext not in FORMATS:
+        raise ValueError(f"Cannot tell the format of {path}; pass --format")
+    return ext
+
+
+def read_rows(path, fmt):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+        elif fmt == 'json':
+            yield from json.load(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def write_rows(path, fmt, rows):
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            writer = csv.DictWriter(f, fieldnames=EXPORT_FIELDS)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        elif fmt == 'json':
+            rows = list(rows)
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+            count = len(rows)
+        else:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + '\n')
+                count += 1
+    return count
+
+
+def resolve(row, client, index):
+    # Titles are matched the way the popup stores them: normalized MAL opening text.
+    # Exported files already hold normalized titles, and normalizing one again can
+    # strip parts of it, so the title is looked up as given first
+    title = row['song_title']
+    found = index.get(title)
+    if found is None:
+        title = normalize_opening(title)
+        found = index.get(title)
+    if found is not None:
+        return title, client.get_info(found[0])
+    if row.get('a_id'):
+        info = client.get_info(int(row['a_id']))
+        if info is not None and any(opening.title == title for opening in info.openings):
+            return title, info
+    return title, None
+
+
+def parse_scores(row):
+    scores = [int(row[field]) for field in SCORE_FIELDS]
+    if not all(1 <= score <= 10 for score in scores):
+        raise ValueError(f"scores must be between 1 and 10, got {scores}")
+    return scores
+
+
+def import_scores(database, client, path, fmt=None, on_conflict='skip'):
+    fmt = detect_format(path, fmt)
+    index = client.opening_index()
+    start = perf_counter()
+
+    rows, unresolved, invalid = [], 0, 0
+    for line, row in enumerate(read_rows(path, fmt), start=1):
+        try:
+            scores = parse_scores(row)
+            title, info = resolve(row, client, index)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Row {line}: skipped, invalid row: {e!r}")
+            invalid += 1
+            continue
+        if info is None:
+            logger.warning(f"Row {line}: skipped, no cached anime has opening {title!r}")
+            unresolved += 1
+            continue
+        rows.append((title, info, scores))
+
+    result = database.insert_many(rows, on_conflict=on_conflict)
+    if result is None:
+        return None
+    written, conflicts = result
+
+    elapsed = perf_counter() - start
+    total = len(rows) + unresolved + invalid
+    logger.info(f"Imported {path}: {written} written, {conflicts} conflicts ({on_conflict}), "
+                f"{unresolved} unresolved, {invalid} invalid; {total} rows in {elapsed:.2f}s "
+                f"({total / elapsed if elapsed else 0:.0f} rows/s)")
+    return {'written': written, 'conflicts': conflicts, 'unresolved': unresolved, 'invalid': invalid,
+            'elapsed': elapsed}
+
+
+def export_scores(database, path, fmt=None):
+    fmt = detect_format(path, fmt)
+    start = perf_counter()
+    count = write_rows(path, fmt, (dict(row) for row in database.iter_rows()))
+    elapsed = perf_counter() - start
+    logger.info(f"Exported {count} rows to {path} in {elapsed:.2f}s "
+                f"({count / elapsed if elapsed else 0:.0f} rows/s)")
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import or export tier list ratings")
+    parser.add_argument('--db', default='app.db', help="Tier list database")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    importer = sub.add_parser('import', help="Load ratings from a file")
+    importer.add_argument('path')
+    importer.add_argument('--format', choices=FORMATS)
+    importer.add_argument('--on-conflict', choices=('skip', 'upsert'), default='skip',
+                          help="What to do with titles that are already rated")
+
+    exporter = sub.add_parser('export', help="Write every rating to a file")
+    exporter.add_argument('path')
+    exporter.add_argument('--format', choices=FORMATS)
+
+    retier = sub.add_parser('retier', help="Recompute every total score and tier from the tier config")
+    retier.add_argument('--config', help="Tier config JSON (defaults to $TIERLIST_TIER_CONFIG or tier_config.json)")
+
+    args = parser.parse_args(argv)
+    metrics.configure_from_env()
+    # Opening the database re-tiers it to this config if the stored one differs
+    database = Database(args.db, TierConfig.load(args.config) if args.command == 'retier' else None)
+    try:
+        if args.command == 'import':
+            from mal_request import MALClient
+            client = MALClient()
+            try:
+                return 0 if import_scores(database, client, args.path, args.format, args.on_conflict) else 1
+            finally:
+                client.close()
+        if args.command == 'retier':
+            return 0 if database.retier() is not None else 1
+        export_scores(database, args.path, args.format)
+        return 0
+    finally:
+        database.close()
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
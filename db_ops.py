@@ -1,159 +1,618 @@
+import ast
+import re
 import sqlite3
+import threading
+from contextlib import contextmanager
 from logger import get_logger
+import metrics
+from tier_config import TierConfig
+
+
+class ConnectionManager:
+    PRAGMAS = (
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        'PRAGMA temp_store=MEMORY',
+        'PRAGMA cache_size=-8000',
+        'PRAGMA mmap_size=67108864',
+        'PRAGMA busy_timeout=5000',
+    )
+
+    def __init__(self, db_name, cached_statements=256):
+        self.db_name = db_name
+        self.cached_statements = cached_statements
+        self.logger = get_logger(__name__)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # isolation_level=None leaves transaction control to transaction(),
+            # sqlite3 keeps its own LRU of prepared statements per connection
+            conn = sqlite3.connect(self.db_name, isolation_level=None,
+                                   cached_statements=self.cached_statements,
+                                   check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            for pragma in self.PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+            self.logger.debug(f"Opened connection to {self.db_name} for thread {threading.current_thread().name}")
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        conn = self.connection()
+        if conn.in_transaction:
+            # Nested use joins the outer transaction
+            yield conn
+            return
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+def _add_total_score(conn):
+    conn.execute('ALTER TABLE tier_list ADD COLUMN total_score INTEGER')
+    conn.execute('UPDATE tier_list SET total_score = score_v + score_mus + score_n + score_mem')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tier_list_tier_score ON tier_list (tier, total_score DESC)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tier_list_a_id ON tier_list (a_id)')
+
+
+def _add_search_index(conn):
+    # tier_list_fts mirrors the rated rows through triggers; opening_search covers
+    # every cached opening (rated or not) and is filled by db.index_openings()
+    conn.execute('DROP TABLE IF EXISTS tier_list_fts')
+    conn.execute('''
+    CREATE VIRTUAL TABLE tier_list_fts USING fts5(
+        song_title, show_title, genres,
+        content='tier_list', content_rowid='id', prefix='2 3')
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS tier_list_ai AFTER INSERT ON tier_list BEGIN
+        INSERT INTO tier_list_fts (rowid, song_title, show_title, genres)
+            VALUES (new.id, new.song_title, new.show_title, new.genres);
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS tier_list_ad AFTER DELETE ON tier_list BEGIN
+        INSERT INTO tier_list_fts (tier_list_fts, rowid, song_title, show_title, genres)
+            VALUES ('delete', old.id, old.song_title, old.show_title, old.genres);
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS tier_list_au AFTER UPDATE OF song_title, show_title, genres ON tier_list BEGIN
+        INSERT INTO tier_list_fts (tier_list_fts, rowid, song_title, show_title, genres)
+            VALUES ('delete', old.id, old.song_title, old.show_title, old.genres);
+        INSERT INTO tier_list_fts (rowid, song_title, show_title, genres)
+            VALUES (new.id, new.song_title, new.show_title, new.genres);
+    END
+    ''')
+    conn.execute("INSERT INTO tier_list_fts (tier_list_fts) VALUES ('rebuild')")
+
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS cached_openings (
+    song_title TEXT PRIMARY KEY,
+    show_title TEXT,
+    genres TEXT,
+    a_id INTEGER)
+    ''')
+    conn.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS opening_search USING fts5(
+        song_title, show_title, genres,
+        content='cached_openings', content_rowid='rowid', prefix='2 3')
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS cached_openings_ai AFTER INSERT ON cached_openings BEGIN
+        INSERT INTO opening_search (rowid, song_title, show_title, genres)
+            VALUES (new.rowid, new.song_title, new.show_title, new.genres);
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS cached_openings_au AFTER UPDATE ON cached_openings BEGIN
+        INSERT INTO opening_search (opening_search, rowid, song_title, show_title, genres)
+            VALUES ('delete', old.rowid, old.song_title, old.show_title, old.genres);
+        INSERT INTO opening_search (rowid, song_title, show_title, genres)
+            VALUES (new.rowid, new.song_title, new.show_title, new.genres);
+    END
+    ''')
+
+
+def _link_genres(conn, entries):
+    # entries are (song_title, genre names) for rows just written; their old
+    # links are replaced so an upsert can't leave stale genres behind
+    entries = list(entries)
+    conn.executemany('INSERT OR IGNORE INTO genres (name) VALUES (?)',
+                     {(genre,) for _, genres in entries for genre in genres})
+    conn.executemany('''
+    DELETE FROM tier_list_genres WHERE tier_list_id = (SELECT id FROM tier_list WHERE song_title = ?)
+    ''', [(song_title,) for song_title, _ in entries])
+    conn.executemany('''
+    INSERT OR IGNORE INTO tier_list_genres (tier_list_id, genre_id)
+        SELECT tier_list.id, genres.id FROM tier_list, genres
+        WHERE tier_list.song_title = ? AND genres.name = ?
+    ''', [(song_title, genre) for song_title, genres in entries for genre in genres])
+
+
+def _parse_start_season(start_season):
+    season, _, year = (start_season or '').partition(', ')
+    season = None if season in ('', 'None') else season
+    year = int(year) if year.isdigit() else None
+    return season, year
+
+
+def _normalize_genres_and_seasons(conn):
+    conn.execute('ALTER TABLE tier_list ADD COLUMN season TEXT')
+    conn.execute('ALTER TABLE tier_list ADD COLUMN year INTEGER')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tier_list_year ON tier_list (year)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tier_list_season_year ON tier_list (season, year)')
+
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS genres (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE)
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS tier_list_genres (
+    tier_list_id INTEGER,
+    genre_id INTEGER,
+    PRIMARY KEY (tier_list_id, genre_id)) WITHOUT ROWID
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tier_list_genres_genre ON tier_list_genres (genre_id, tier_list_id)')
+    # Foreign keys are off, so deleted rows clean up their own links
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS tier_list_genres_ad AFTER DELETE ON tier_list BEGIN
+        DELETE FROM tier_list_genres WHERE tier_list_id = old.id;
+    END
+    ''')
+    # refresh_db drops tier_list without firing the trigger
+    conn.execute('DELETE FROM tier_list_genres WHERE tier_list_id NOT IN (SELECT id FROM tier_list)')
+
+    # Existing rows carry genres as a Python list repr and the season as "season, year"
+    rows = conn.execute('SELECT id, song_title, genres, start_season FROM tier_list').fetchall()
+    entries = []
+    for row in rows:
+        try:
+            genres = ast.literal_eval(row['genres']) if row['genres'] else []
+        except (ValueError, SyntaxError):
+            genres = []
+        entries.append((row['song_title'], [genre for genre in genres if isinstance(genre, str)]))
+    conn.executemany('UPDATE tier_list SET season = ?, year = ? WHERE id = ?',
+                     [(*_parse_start_season(row['start_season']), row['id']) for row in rows])
+    _link_genres(conn, entries)
+
+
+def _add_settings(conn):
+    # Key/value state that belongs with the data, such as the tier config the
+    # rows were last tiered with
+    conn.execute('CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+
+
+# Applied in order on top of the base tier_list table; PRAGMA user_version
+# records how many have run against a given database file.
+MIGRATIONS = (
+    _add_total_score,
+    _add_search_index,
+    _normalize_genres_and_seasons,
+    _add_settings,
+)
+
+SEARCH_TERM = re.compile(r'\w+')
+
+# Every column a rating writes, in the order _rating_params lays them out
+RATING_COLUMNS = ('song_title', 'show_title', 'a_id', 'mal_score', 'rank', 'popularity', 'genres', 'start_season',
+                  'season', 'year', 'tier', 'score_v', 'score_mus', 'score_n', 'score_mem', 'total_score')
+INSERT_RATING = (f"INSERT INTO tier_list ({', '.join(RATING_COLUMNS)}) "
+                 f"VALUES ({', '.join('?' * len(RATING_COLUMNS))})")
+
 
 class db():
-    def __init__(self, db_name='app.db'):
+    def __init__(self, db_name='app.db', tiers=None):
         self.db_name = db_name
         self.logger = get_logger(__name__)
+        self.tiers = tiers or TierConfig.load()
 
         self.logger.info(f"Initializing database: {self.db_name}")
 
-        self.conn = sqlite3.connect(self.db_name)
-        self.cursor = self.conn.cursor()
-
-        try:
-            self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tier_list (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            song_title TEXT UNIQUE,
-            show_title TEXT,
-            a_id INTEGER,
-            mal_score REAL,
-            rank INTEGER,
-            popularity INTEGER,
-            genres TEXT,
-            start_season TEXT,
-            tier TEXT,
-            score_v INTEGER,
-            score_mus INTEGER,
-            score_n INTEGER,
-            score_mem INTEGER)
-            ''')
+        self.pool = ConnectionManager(self.db_name)
+        self._rated = None
+        self._changes = 0  # bumped by every write made through this object
+
+        try:
+            with self.pool.transaction() as conn:
+                self._create_table(conn)
+                self._migrate(conn)
 
             self.logger.info(f"Database initialized successfully")
         except sqlite3.Error as e:
             self.logger.error(f"Error creating table: {e}")
-        finally:
-            self.cursor.close()
-            self.conn.close()
+            return
+        self._sync_tier_config()
 
-    def refresh_db(self):
-        self.conn = sqlite3.connect(self.db_name)
-        self.cursor = self.conn.cursor()
+    @staticmethod
+    def _create_table(conn):
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS tier_list (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        song_title TEXT UNIQUE,
+        show_title TEXT,
+        a_id INTEGER,
+        mal_score REAL,
+        rank INTEGER,
+        popularity INTEGER,
+        genres TEXT,
+        start_season TEXT,
+        tier TEXT,
+        score_v INTEGER,
+        score_mus INTEGER,
+        score_n INTEGER,
+        score_mem INTEGER)
+        ''')
+
+    def _migrate(self, conn):
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        for migration in MIGRATIONS[version:]:
+            self.logger.info(f"Applying migration {migration.__name__} to {self.db_name}")
+            migration(conn)
+        if version < len(MIGRATIONS):
+            conn.execute(f'PRAGMA user_version = {len(MIGRATIONS)}')
 
+    def _sync_tier_config(self):
+        # Existing rows keep the scheme they were last tiered with, so a config
+        # edited since then is applied to them before anything new goes in
+        row = self.pool.connection().execute("SELECT value FROM settings WHERE key = 'tier_config'").fetchone()
         try:
-            self.cursor.execute('''
-                DROP TABLE tier_list
-            ''')
+            applied = TierConfig.from_json(row[0]) if row is not None else None
+        except ValueError as e:
+            self.logger.warning(f"Ignoring unreadable stored tier config: {e}")
+            applied = None
+        if applied == self.tiers:
+            return
+        if applied is not None:
+            self.logger.warning(f"Ratings were last tiered with {applied}; re-tiering with the current config")
+        self.retier(self.tiers)
+
+    def change_token(self):
+        # Differs whenever the data may have changed: writes made here bump the
+        # counter, and data_version moves when any other connection commits
+        data_version = self.pool.connection().execute('PRAGMA data_version').fetchone()[0]
+        return self._changes, data_version
+
+    def close(self):
+        self.pool.close()
 
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS tier_list
-                (
-                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-                     song_title TEXT UNIQUE,
-                     show_title TEXT,
-                     a_id INTEGER,
-                     mal_score REAL,
-                     rank INTEGER,
-                     popularity INTEGER,
-                     genres TEXT,
-                     start_season TEXT,
-                     tier TEXT,
-                     score_v INTEGER,
-                     score_mus INTEGER,
-                     score_n INTEGER,
-                     score_mem INTEGER
-                )''')
+    @metrics.timed('db_query', op='refresh_db')
+    def refresh_db(self):
+        try:
+            with self.pool.transaction() as conn:
+                conn.execute('''
+                    DROP TABLE tier_list
+                ''')
+                self._create_table(conn)
+                conn.execute('PRAGMA user_version = 0')
+                self._migrate(conn)
+            self._rated = set()
+            self._changes += 1
             self.logger.info(f"Database Refreshed successfully")
         except sqlite3.Error as e:
             self.logger.error(f"Error refreshing table: {e}")
-        finally:
-            self.cursor.close()
-            self.conn.close()
-
-    def insert_data(self, name, info, scores):
-        self.conn = sqlite3.connect(self.db_name)
-        self.cursor = self.conn.cursor()
-        self.logger.info(f"Inserting data for opening {name['text']} into database: {self.db_name}")
-
-        genres = []
-        for genre in info['genres']:
-            genres.append(genre['name'])
-
-        final_score = 0
-        for score in scores:
-            final_score += score
-
-        if final_score >= 36:
-            tier = "S"
-        elif final_score >= 30:
-            tier = "A"
-        elif final_score >= 24:
-            tier = "B"
+
+    def preview(self, song_title, info, scores):
+        # Same columns as a find_tier row, plus the tier it lands in; id stays
+        # None until the row is actually written
+        total_score = self.tiers.total(scores)
+        return {'id': None, 'song_title': song_title, 'show_title': info.title, 'a_id': info.id,
+                'score_v': scores[0], 'score_mus': scores[1], 'score_n': scores[2], 'score_mem': scores[3],
+                'total_score': total_score, 'tier': self.tiers.tier_for(total_score)}
+
+    @staticmethod
+    def _rating_params(info, result):
+        return (result['song_title'], info.title, info.id, info.mean, info.rank, info.popularity,
+                str(list(info.genres)), info.start_season, info.season, info.year, result['tier'],
+                result['score_v'], result['score_mus'], result['score_n'], result['score_mem'], result['total_score'])
+
+    @staticmethod
+    def _insert_row(conn, info, result):
+        cursor = conn.execute(INSERT_RATING, db._rating_params(info, result))
+        _link_genres(conn, [(result['song_title'], info.genres)])
+        return cursor.lastrowid
+
+    @metrics.timed('db_query', op='insert_data')
+    def insert_data(self, song_title, info, scores):
+        self.logger.info("Inserting data for opening %s into database: %s", song_title, self.db_name)
+
+        result = self.preview(song_title, info, scores)
+        try:
+            with self.pool.transaction() as conn:
+                result['id'] = self._insert_row(conn, info, result)
+
+            if self._rated is not None:
+                self._rated.add(song_title)
+            self._changes += 1
+            self.logger.info("Data inserted successfully")
+        except sqlite3.Error as e:
+            self.logger.error(f"Error inserting data: {e}")
+            return None
+        return result
+
+    @metrics.timed('db_query', op='insert_batch')
+    def insert_batch(self, entries):
+        # entries are (song_title, info, scores); all of them share one
+        # transaction, and a savepoint per entry lets one bad row (a duplicate
+        # song_title, say) fail without taking the rest with it.
+        # Returns (result, None) or (None, error message) per entry, in order.
+        outcomes = []
+        try:
+            with self.pool.transaction() as conn:
+                for song_title, info, scores in entries:
+                    result = self.preview(song_title, info, scores)
+                    conn.execute('SAVEPOINT rating')
+                    try:
+                        result['id'] = self._insert_row(conn, info, result)
+                    except sqlite3.IntegrityError as e:
+                        conn.execute('ROLLBACK TO rating')
+                        outcomes.append((None, str(e)))
+                    else:
+                        outcomes.append((result, None))
+                    finally:
+                        conn.execute('RELEASE rating')
+        except sqlite3.Error as e:
+            self.logger.error(f"Error inserting batch of {len(entries)} ratings: {e}")
+            return [(None, str(e))] * len(entries)
+
+        saved = [result['song_title'] for result, _ in outcomes if result is not None]
+        if self._rated is not None:
+            self._rated.update(saved)
+        self._changes += 1
+        self.logger.info("Inserted %d of %d ratings in one transaction", len(saved), len(entries))
+        return outcomes
+
+    @metrics.timed('db_query', op='insert_many')
+    def insert_many(self, rows, on_conflict='skip'):
+        # rows are (song_title, info, scores) triples; one executemany inside one
+        # transaction instead of a commit per rating
+        if on_conflict not in ('skip', 'upsert'):
+            raise ValueError(f"Unknown conflict policy: {on_conflict}")
+
+        rows = list(rows)
+        params = [self._rating_params(info, self.preview(song_title, info, scores))
+                  for song_title, info, scores in rows]
+        if not params:
+            return 0, 0
+
+        if on_conflict == 'upsert':
+            conflict = 'DO UPDATE SET ' + ', '.join(f'{column} = excluded.{column}' for column in RATING_COLUMNS[1:])
         else:
-            tier = "C"
+            conflict = 'DO NOTHING'
 
-        season = str(info['start_season']['season']) + ", " + str(info['start_season']['year'])
+        self.logger.info("Inserting %d rows into database: %s", len(params), self.db_name)
+        titles = [row[0] for row in params]
+        try:
+            with self.pool.transaction() as conn:
+                existing = self.find_existing(titles)
+                conn.executemany(f'{INSERT_RATING} ON CONFLICT(song_title) {conflict}', params)
+                # Skipped conflicts keep the row, and the genres, they already had
+                _link_genres(conn, {song_title: info.genres for song_title, info, _ in rows
+                                    if on_conflict == 'upsert' or song_title not in existing}.items())
+        except sqlite3.Error as e:
+            self.logger.error(f"Error inserting rows: {e}")
+            return None
+
+        if self._rated is not None:
+            self._rated.update(titles)
+        self._changes += 1
+        # Titles repeated within the batch conflict with the row inserted earlier in it
+        conflicts = len(titles) - len(set(titles) - existing)
+        self.logger.info("Inserted %d rows, %d conflicts (%s)", len(titles) - conflicts, conflicts, on_conflict)
+        return len(titles) - conflicts, conflicts
 
+    @metrics.timed('db_query', op='retier')
+    def retier(self, tiers=None):
+        # Recomputes total_score and tier for every row in one statement; SET
+        # expressions see the old row, so the CASE repeats the total expression
+        tiers = tiers or self.tiers
+        total_expr, total_params = tiers.total_sql()
+        tier_expr, tier_params = tiers.tier_sql(total_expr, total_params)
+        self.logger.info(f"Re-tiering database {self.db_name} with {tiers}")
         try:
-            self.cursor.execute('''
-            INSERT INTO tier_list (song_title, show_title, a_id, mal_score, rank, popularity, genres, start_season, tier, score_v, score_mus, score_n, score_mem)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (name['text'], info['title'], info['id'], info['mean'], info['rank'], info['popularity'], str(genres), season, tier, scores[0], scores[1], scores[2], scores[3] ))
+            with self.pool.transaction() as conn:
+                cursor = conn.execute(f'''
+                UPDATE tier_list SET total_score = {total_expr}, tier = {tier_expr}
+                ''', total_params + tier_params)
+                conn.execute('''
+                INSERT INTO settings (key, value) VALUES ('tier_config', ?)
+                    ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                ''', (tiers.to_json(),))
+        except sqlite3.Error as e:
+            self.logger.error(f"Error re-tiering rows: {e}")
+            return None
+        self.tiers = tiers
+        self._changes += 1
+        self.logger.info(f"Re-tiered {cursor.rowcount} rows")
+        return cursor.rowcount
 
-            self.conn.commit()
+    @metrics.timed('db_query', op='index_openings')
+    def index_openings(self, infos):
+        # Upserts the searchable text of cached openings; unchanged rows are left alone
+        params = [(opening.title, info.title, ' '.join(info.genres), info.id)
+                  for info in infos for opening in info.openings]
+        if not params:
+            return
+        try:
+            with self.pool.transaction() as conn:
+                conn.executemany('''
+                INSERT INTO cached_openings (song_title, show_title, genres, a_id) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(song_title) DO UPDATE SET show_title = excluded.show_title,
+                        genres = excluded.genres, a_id = excluded.a_id
+                    WHERE show_title IS NOT excluded.show_title OR genres IS NOT excluded.genres
+                        OR a_id IS NOT excluded.a_id
+                ''', params)
+            self.logger.debug("Indexed %d openings for search", len(params))
+        except sqlite3.Error as e:
+            self.logger.error(f"Error indexing openings: {e}")
+
+    def indexed_anime(self):
+        return {row[0] for row in self.pool.connection().execute('SELECT DISTINCT a_id FROM cached_openings')}
 
-            self.logger.info(f"Data inserted successfully")
+    @metrics.timed('db_query', op='search')
+    def search(self, text):
+        # Every word must match, each as a prefix; returns matching song titles
+        # from both the rated rows and the cached openings, or None for no filter.
+        # Titles are read from the base tables by rowid, which is far cheaper than
+        # having FTS5 fetch its external content row by row
+        terms = SEARCH_TERM.findall(text)
+        if not terms:
+            return None
+        query = ' '.join(f'"{term}"*' for term in terms)
+        try:
+            rows = self.pool.connection().execute('''
+            SELECT song_title FROM tier_list
+                WHERE id IN (SELECT rowid FROM tier_list_fts WHERE tier_list_fts MATCH ?1)
+            UNION ALL
+            SELECT song_title FROM cached_openings
+                WHERE rowid IN (SELECT rowid FROM opening_search WHERE opening_search MATCH ?1)
+            ''', (query,)).fetchall()
         except sqlite3.Error as e:
-            self.logger.error(f"Error inserting data: {e}")
-        finally:
-            self.cursor.close()
-            self.conn.close()
+            self.logger.error(f"Error searching for {text!r}: {e}")
+            return set()
+        return {row[0] for row in rows}
 
-    def find_if_exists(self,name):
-        self.conn = sqlite3.connect(self.db_name)
-        self.cursor = self.conn.cursor()
-        self.logger.debug(f"Checking if {name} exists in database: {self.db_name}")
+    @metrics.timed('db_query', op='find_filtered')
+    def find_filtered(self, tier=None, genres=(), season=None, year_from=None, year_to=None):
+        # Every given condition must hold; a row needs all of the listed genres
+        conditions, params = [], []
+        if tier is not None:
+            conditions.append('tier = ?')
+            params.append(tier)
+        if season is not None:
+            conditions.append('season = ?')
+            params.append(season)
+        if year_from is not None:
+            conditions.append('year >= ?')
+            params.append(year_from)
+        if year_to is not None:
+            conditions.append('year <= ?')
+            params.append(year_to)
+        genres = list(genres)
+        if genres:
+            conditions.append(f'''id IN (
+                SELECT tier_list_id FROM tier_list_genres JOIN genres ON genres.id = tier_list_genres.genre_id
+                WHERE genres.name IN ({', '.join('?' * len(genres))})
+                GROUP BY tier_list_id HAVING COUNT(*) = ?)''')
+            params += genres + [len(genres)]
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        try:
+            return self.pool.connection().execute(f'''
+            SELECT id, song_title, show_title, a_id, score_v, score_mus, score_n, score_mem, total_score, tier
+            FROM tier_list {where}
+            ORDER BY total_score DESC
+            ''', params).fetchall()
+        except sqlite3.Error as e:
+            self.logger.error(f"Error filtering tier list: {e}")
+            return []
+
+    def genre_names(self):
+        try:
+            return {row[0] for row in self.pool.connection().execute('SELECT name FROM genres')}
+        except sqlite3.Error as e:
+            self.logger.error(f"Error loading genres: {e}")
+            return set()
 
+    def iter_rows(self):
         try:
-            self.cursor.execute('''
-            SELECT * FROM tier_list WHERE song_title = ?
-            ''', (name,))
+            cursor = self.pool.connection().execute('''
+            SELECT song_title, show_title, a_id, score_v, score_mus, score_n, score_mem, total_score, tier
+            FROM tier_list ORDER BY id
+            ''')
+            yield from cursor
+        except sqlite3.Error as e:
+            self.logger.error(f"Error reading rows: {e}")
+
+    @metrics.timed('db_query', op='find_if_exists')
+    def find_if_exists(self,name):
+        self.logger.debug("Checking if %s exists in database: %s", name, self.db_name)
 
-            result = self.cursor.fetchone()
+        try:
+            result = self.pool.connection().execute('''
+            SELECT 1 FROM tier_list WHERE song_title = ?
+            ''', (name,)).fetchone()
             if result:
-                self.logger.debug(f"{name} exists in database")
+                self.logger.debug("%s exists in database", name)
                 return True
             else:
-                self.logger.debug(f"{name} does not exist in database")
+                self.logger.debug("%s does not exist in database", name)
                 return False
         except sqlite3.Error as e:
             self.logger.error(f"Error checking if {name} exists: {e}")
-        finally:
-            self.cursor.close()
-            self.conn.close()
 
+    def rated_titles(self):
+        if self._rated is None:
+            self.logger.debug(f"Loading rated song titles from database: {self.db_name}")
+            try:
+                with metrics.span('db_query', op='rated_titles'):
+                    rows = self.pool.connection().execute('''
+                    SELECT song_title FROM tier_list
+                    ''').fetchall()
+            except sqlite3.Error as e:
+                self.logger.error(f"Error loading rated song titles: {e}")
+                return set()
+            self._rated = {row[0] for row in rows}
+            self.logger.debug(f"Loaded {len(self._rated)} rated song titles")
+        return self._rated
+
+    @metrics.timed('db_query', op='find_existing')
+    def find_existing(self, names, batch_size=500):
+        # Batched IN (...) lookup for callers that need to hit the database directly
+        names = list(names)
+        found = set()
+        try:
+            conn = self.pool.connection()
+            for start in range(0, len(names), batch_size):
+                batch = names[start:start + batch_size]
+                placeholders = ', '.join('?' * len(batch))
+                rows = conn.execute(f'''
+                SELECT song_title FROM tier_list WHERE song_title IN ({placeholders})
+                ''', batch).fetchall()
+                found.update(row[0] for row in rows)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error checking existing song titles: {e}")
+        return found
+
+    @metrics.timed('db_query', op='find_tier')
     def find_tier(self, tier):
-        self.conn = sqlite3.connect(self.db_name)
-        self.cursor = self.conn.cursor()
-        self.logger.debug(f"Finding {tier} tier in database: {self.db_name}")
+        self.logger.debug("Finding %s tier in database: %s", tier, self.db_name)
 
         try:
-            self.cursor.execute('''
-            SELECT * FROM tier_list WHERE tier = ?
-            ''', (tier,))
-            result = self.cursor.fetchall()
+            result = self.pool.connection().execute('''
+            SELECT id, song_title, show_title, a_id, score_v, score_mus, score_n, score_mem, total_score
+            FROM tier_list WHERE tier = ?
+            ORDER BY total_score DESC
+            ''', (tier,)).fetchall()
             if result:
-                self.logger.debug(f"{tier} tier found in database")
+                self.logger.debug("%s tier found in database", tier)
                 return result
             else:
-                self.logger.debug(f"{tier} tier not found in database")
+                self.logger.debug("%s tier not found in database", tier)
                 return None
         except sqlite3.Error as e:
             self.logger.error(f"Error finding {tier} tier: {e}")
-        finally:
-            self.cursor.close()
-            self.conn.close()
 
 if __name__ == '__main__':
     db = db()
@@ -0,0 +1,69 @@
+import queue
+import threading
+from time import monotonic
+
+from logger import get_logger
+import metrics
+
+
+class DBWriter(threading.Thread):
+    # Owns every rating write so the Tk thread never waits on a commit.
+    # Submissions arriving within `batch_window` seconds of each other are
+    # written in one transaction; outcomes go on `events` for the Tk thread:
+    #   ('saved', ticket, result)   result is the stored row, id included
+    #   ('failed', ticket, error)
+    def __init__(self, database, events, batch_window=0.05, max_batch=100):
+        super().__init__(name='db-writer', daemon=True)
+        self.db = database
+        self.events = events
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.requests = queue.Queue()
+        self.logger = get_logger(__name__)
+
+    def submit(self, ticket, song_title, info, scores):
+        # ticket is handed back untouched with the outcome
+        self.requests.put((ticket, (song_title, info, scores)))
+
+    def close(self, timeout=10):
+        # Everything submitted before close() is still written
+        self.requests.put(None)
+        self.join(timeout)
+
+    def _next_batch(self):
+        first = self.requests.get()
+        if first is None:
+            return None, True
+        batch = [first]
+        deadline = monotonic() + self.batch_window
+        while len(batch) < self.max_batch:
+            try:
+                request = self.requests.get(timeout=max(0, deadline - monotonic()))
+            except queue.Empty:
+                break
+            if request is None:
+                return batch, True
+            batch.append(request)
+        return batch, False
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if not batch:
+                continue
+            tickets, entries = zip(*batch)
+            try:
+                outcomes = self.db.insert_batch(entries)
+            except Exception as e:
+                self.logger.error(f'Rating write failed: {e}')
+                outcomes = [(None, str(e))] * len(entries)
+
+            metrics.incr('db_write_batches')
+            metrics.incr('db_writes', len(entries))
+            for ticket, entry, (result, error) in zip(tickets, entries, outcomes):
+                if result is not None:
+                    self.events.put(('saved', ticket, result))
+                else:
+                    self.logger.error(f'Rating for {entry[0]} not saved: {error}')
+                    self.events.put(('failed', ticket, error))
@@ -0,0 +1,127 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from time import perf_counter, sleep
+
+import requests
+
+from logger import get_logger
+from rate_limit import TokenBucket
+
+
+class DownloadReport:
+    def __init__(self):
+        self.downloaded = []
+        self.failed = []
+        self.cancelled = []  # jobs skipped because a cancel came before they started
+        self.bytes = 0
+        self.elapsed = 0.0
+
+    @property
+    def throughput(self):
+        if not self.elapsed:
+            return 0.0
+        return len(self.downloaded) / self.elapsed
+
+    def __str__(self):
+        cancelled = f"{len(self.cancelled)} cancelled, " if self.cancelled else ""
+        return (f"{len(self.downloaded)} downloaded, {len(self.failed)} failed, {cancelled}"
+                f"{self.bytes / 1024:.0f} KiB in {self.elapsed:.2f}s "
+                f"({self.throughput:.1f} images/s)")
+
+
+class ImageDownloader:
+    def __init__(self, images_dir, workers=8, rate=5.0, burst=None, retries=3, backoff=0.5, timeout=15, session=None,
+                 on_saved=None, cancelled=None):
+        self.images_dir = images_dir
+        self.workers = workers
+        self.limiter = TokenBucket(rate, burst)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = session or requests
+        # Called with the anime id after a cover is written, e.g. to drop cached thumbnails
+        self.on_saved = on_saved
+        # Optional threading.Event; once set, jobs that have not started are skipped
+        self.cancelled = cancelled
+        self.logger = get_logger(__name__)
+
+    def image_path(self, anime_id):
+        return os.path.join(self.images_dir, f'{anime_id}.jpg')
+
+    def _write_atomic(self, path, content):
+        # Write beside the target so the rename stays on one filesystem
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def fetch(self, anime_id, image_url):
+        # Returns the number of bytes written, or None when cancelled before starting
+        if self.cancelled is not None and self.cancelled.is_set():
+            return None
+
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                delay = self.backoff * 2 ** (attempt - 1)
+                self.logger.debug('Retrying image %s in %.2fs (%s)', anime_id, delay, last_error)
+                sleep(delay)
+
+            self.limiter.acquire()
+            try:
+                r = self.session.get(image_url, timeout=self.timeout)
+            except requests.RequestException as e:
+                last_error = e
+                continue
+
+            if r.ok:
+                self._write_atomic(self.image_path(anime_id), r.content)
+                if self.on_saved:
+                    self.on_saved(anime_id)
+                self.logger.debug('Image downloaded successfully: %s', anime_id)
+                return len(r.content)
+
+            last_error = f'HTTP {r.status_code}'
+            # Client errors other than throttling will not succeed on retry
+            if r.status_code < 500 and r.status_code != 429:
+                break
+
+        raise IOError(f'Error downloading image: {anime_id}->{last_error}')
+
+    def download(self, jobs, progress=None):
+        jobs = list(jobs)
+        report = DownloadReport()
+        if not jobs:
+            return report
+
+        self.logger.info(f'Downloading {len(jobs)} images with {self.workers} workers')
+        start = perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='image-dl') as pool:
+            futures = {pool.submit(self.fetch, anime_id, url): anime_id for anime_id, url in jobs}
+            for future in as_completed(futures):
+                anime_id = futures[future]
+                try:
+                    size = future.result()
+                except IOError as e:
+                    self.logger.warning(str(e))
+                    report.failed.append(anime_id)
+                else:
+                    if size is None:
+                        report.cancelled.append(anime_id)
+                    else:
+                        report.bytes += size
+                        report.downloaded.append(anime_id)
+                if progress:
+                    progress(len(report.downloaded) + len(report.failed) + len(report.cancelled), len(jobs))
+        report.elapsed = perf_counter() - start
+
+        self.logger.info(f'Image download finished: {report}')
+        return report
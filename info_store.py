@@ -0,0 +1,110 @@
+import json
+import os
+import sqlite3
+
+from db_ops import ConnectionManager
+from logger import get_logger
+
+
+class InfoStore:
+    def __init__(self, db_name):
+        self.db_name = db_name
+        self.logger = get_logger(__name__)
+        self.pool = ConnectionManager(db_name)
+
+        try:
+            with self.pool.transaction() as conn:
+                conn.execute('''
+                CREATE TABLE IF NOT EXISTS anime_info (
+                id INTEGER PRIMARY KEY,
+                data TEXT NOT NULL)
+                ''')
+        except sqlite3.Error as e:
+            self.logger.error(f"Error creating anime_info table: {e}")
+
+    def get(self, anime_id):
+        try:
+            anime_id = int(anime_id)
+        except (TypeError, ValueError):
+            self.logger.warning(f"Not an anime id: {anime_id!r}")
+            return None
+        row = self.pool.connection().execute('''
+        SELECT data FROM anime_info WHERE id = ?
+        ''', (anime_id,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def __contains__(self, anime_id):
+        return self.pool.connection().execute('''
+        SELECT 1 FROM anime_info WHERE id = ?
+        ''', (int(anime_id),)).fetchone() is not None
+
+    def __len__(self):
+        return self.pool.connection().execute('SELECT COUNT(*) FROM anime_info').fetchone()[0]
+
+    def iter_all(self):
+        for anime_id, data in self.pool.connection().execute('SELECT id, data FROM anime_info'):
+            yield anime_id, json.loads(data)
+
+    def ids(self):
+        return {row[0] for row in self.pool.connection().execute('SELECT id FROM anime_info')}
+
+    def genre_names(self):
+        # Read out of the stored JSON by SQLite, so no record is decoded in Python
+        return {row[0] for row in self.pool.connection().execute('''
+        SELECT DISTINCT json_extract(genre.value, '$.name') FROM anime_info, json_each(data, '$.genres') AS genre
+        ''')}
+
+    def years(self):
+        return {row[0] for row in self.pool.connection().execute('''
+        SELECT DISTINCT json_extract(data, '$.start_season.year') FROM anime_info
+        ''') if row[0]}
+
+    def put(self, anime_id, info):
+        with self.pool.transaction() as conn:
+            conn.execute('''
+            INSERT OR REPLACE INTO anime_info (id, data) VALUES (?, ?)
+            ''', (int(anime_id), json.dumps(info, ensure_ascii=False)))
+
+    def put_many(self, records):
+        with self.pool.transaction() as conn:
+            conn.executemany('''
+            INSERT OR REPLACE INTO anime_info (id, data) VALUES (?, ?)
+            ''', ((int(anime_id), json.dumps(info, ensure_ascii=False)) for anime_id, info in records))
+
+    def import_json(self, info_json_path, checkpoint_path=None):
+        # One-time move of a legacy info.json (plus any leftover info.ndjson
+        # checkpoint) into the store; the source files are renamed afterwards
+        imported = 0
+        if os.path.exists(info_json_path):
+            try:
+                with open(info_json_path, 'r', encoding='utf-8') as f:
+                    info_dict = json.load(f)
+            except (IOError, json.JSONDecodeError) as e:
+                self.logger.error(f"Error reading {info_json_path}: {e}")
+                return 0
+            self.put_many(info_dict.items())
+            imported += len(info_dict)
+            os.replace(info_json_path, f'{info_json_path}.imported')
+
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            records = []
+            with open(checkpoint_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash can leave the final line half written
+                        continue
+                    records.append((record['id'], record))
+            self.put_many(records)
+            imported += len(records)
+            os.replace(checkpoint_path, f'{checkpoint_path}.imported')
+
+        if imported:
+            self.logger.info(f"Imported {imported} anime info records into {self.db_name}")
+        return imported
+
+    def close(self):
+        self.pool.close()
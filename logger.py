@@ -1,19 +1,41 @@
+import atexit
 import logging
+import os
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
+# "async" (default): loggers only enqueue records and one background listener
+# formats them and owns the file/stdout handlers.
+# "sync": handlers run on the calling thread, as before.
+LOG_MODE = os.getenv('TIERLIST_LOG_MODE', 'async')
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 3
 
-def get_logger(name=__name__):
-    logger = logging.getLogger(name)
-    if not logger.hasHandlers():
+_handlers = None
+_queue_handler = None
+_listener = None
+
+
+class _LazyQueueHandler(QueueHandler):
+    # QueueHandler.prepare() formats the message on the calling thread; the
+    # listener formats it instead, so %-style arguments are only rendered there
+    def prepare(self, record):
+        return record
+
+
+def _shared_handlers():
+    global _handlers
+    if _handlers is None:
         formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] %(name)s: %(message)s')
 
         # Handler for all logs (including debug), does NOT print to stdout
-        debug_file_handler = logging.FileHandler('debug.log')
+        debug_file_handler = RotatingFileHandler('debug.log', maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT)
         debug_file_handler.setLevel(logging.DEBUG)
         debug_file_handler.setFormatter(formatter)
 
         # Handler for INFO and higher (no debug), to file
-        file_handler = logging.FileHandler('app.log')
+        file_handler = RotatingFileHandler('app.log', maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT)
         file_handler.setLevel(logging.INFO)
         file_handler.setFormatter(formatter)
 
@@ -22,11 +44,37 @@ def get_logger(name=__name__):
         stream_handler.setLevel(logging.INFO)
         stream_handler.setFormatter(formatter)
 
-        logger.addHandler(debug_file_handler)
-        logger.addHandler(file_handler)
-        logger.addHandler(stream_handler)
+        _handlers = (debug_file_handler, file_handler, stream_handler)
+    return _handlers
 
-    logger.setLevel(logging.DEBUG)  # Most permissive level to allow handlers to filter as needed
-    return logger
 
+def _get_queue_handler():
+    global _queue_handler, _listener
+    if _queue_handler is None:
+        records = queue.SimpleQueue()
+        _queue_handler = _LazyQueueHandler(records)
+        _listener = QueueListener(records, *_shared_handlers(), respect_handler_level=True)
+        _listener.start()
+        # Drain whatever is still queued before the interpreter exits
+        atexit.register(shutdown)
+    return _queue_handler
 
+
+def shutdown():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name=__name__):
+    logger = logging.getLogger(name)
+    if not logger.hasHandlers():
+        if LOG_MODE == 'sync':
+            for handler in _shared_handlers():
+                logger.addHandler(handler)
+        else:
+            logger.addHandler(_get_queue_handler())
+
+    logger.setLevel(logging.DEBUG)  # Most permissive level to allow handlers to filter as needed
+    return logger
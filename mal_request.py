@@ -1,14 +1,68 @@
 import json
+import threading
 from pathlib import Path
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import hashlib
 from dotenv import load_dotenv
 import os
-from time import sleep
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from logger import get_logger
+import metrics
+from image_downloader import ImageDownloader
+from rate_limit import TokenBucket
+from info_store import InfoStore
+from anime_info import AnimeInfo, OpeningIndex
+
+def _record_response(r, *args, **kwargs):
+    host = requests.utils.urlparse(r.url).hostname
+    metrics.observe('http_request', r.elapsed.total_seconds(), host=host, method=r.request.method)
+    metrics.incr('http_responses', host=host, status=r.status_code)
+    metrics.incr('http_response_bytes', len(r.content), host=host)
+
+
+def build_session(pool_size=10, retries=3, backoff=0.5):
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({'GET', 'HEAD'}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.hooks['response'].append(_record_response)
+    return session
+
+
+class ListDiff:
+    def __init__(self, added=(), removed=(), changed=()):
+        self.added = set(added)
+        self.removed = set(removed)
+        self.changed = set(changed)
+        # New fingerprints of changed entries, recorded once their info is re-fetched
+        self.fingerprints = {}
+
+    @property
+    def touched(self):
+        return self.added | self.changed
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def __repr__(self):
+        return f'ListDiff(added={len(self.added)}, removed={len(self.removed)}, changed={len(self.changed)})'
+
 
 class MALClient:
-    def __init__(self, user_name='x4061691', env_path='MAL_KEY.env'):
+    def __init__(self, user_name='x4061691', env_path='MAL_KEY.env', download_workers=8, download_rate=5.0,
+                 info_workers=4, api_rate=3.0,
+                 pool_size=10, retries=3, timeout=(5, 30)):
         load_dotenv(env_path)
         self.env_path = env_path
         self.MAL_CLIENT_ID = os.getenv('MAL_CLIENT_ID')
@@ -20,12 +74,54 @@ class MALClient:
         self.logger = get_logger(__name__)
         os.makedirs(self.responses_dir, exist_ok=True)
         os.makedirs(self.images_dir, exist_ok=True)
+        self.timeout = timeout
+        self.session = build_session(pool_size=max(pool_size, download_workers, info_workers), retries=retries)
+        self._refresh_lock = threading.Lock()
+        # Records are loaded from the store on first use and kept here as AnimeInfo
+        self._info_dict = {}
+        self.info_store = InfoStore(f'{self.responses_dir}/info.db')
+        self._opening_index = None
+        # Set from another thread to stop a running sync between requests
+        self.cancelled = threading.Event()
+        # The session already retries 429/5xx, so the downloader only covers connection errors
+        self.downloader = ImageDownloader(self.images_dir, workers=download_workers, rate=download_rate,
+                                          retries=1, timeout=timeout, session=self.session,
+                                          cancelled=self.cancelled)
+        self.info_workers = info_workers
+        # Shared by every worker that talks to the MAL API
+        self.api_limiter = TokenBucket(api_rate)
+
+    def api_get(self, url, params=None):
+        token = self.MAL_ACCESS_TOKEN
+        r = self.session.get(url, headers={'Authorization': f'Bearer {token}'},
+                             params=params, timeout=self.timeout)
+        if r.status_code != 401:
+            return r
+
+        r.close()
+        with self._refresh_lock:
+            # Another worker may already have refreshed while we waited
+            if self.MAL_ACCESS_TOKEN == token:
+                self.logger.warning("Access token rejected mid-run, refreshing tokens")
+                try:
+                    self.refresh_tokens()
+                except requests.HTTPError as e:
+                    self.logger.error(f"Error refreshing token: {e}")
+                    raise
+        return self.session.get(url, headers={'Authorization': f'Bearer {self.MAL_ACCESS_TOKEN}'},
+                                params=params, timeout=self.timeout)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def close(self):
+        self.session.close()
 
     def is_valid_token(self):
         url = 'https://api.myanimelist.net/v2/users/@me'
-        response = requests.get(url, headers={
+        response = self.session.get(url, headers={
             'Authorization': f'Bearer {self.MAL_ACCESS_TOKEN}'
-        })
+        }, timeout=self.timeout)
 
         if response.ok:
             self.logger.info("Valid access token")
@@ -37,7 +133,7 @@ class MALClient:
                 self.refresh_tokens()
                 return True
             except requests.HTTPError as e:
-                self.logger.error("Error refreshing token: {e}")
+                self.logger.error(f"Error refreshing token: {e}")
                 return False
         else:
             self.logger.error(f"Error validating token: {response.status_code}")
@@ -50,7 +146,7 @@ class MALClient:
             'grant_type': 'refresh_token',
             'refresh_token': self.MAL_REFRESH_TOKEN
         }
-        response = requests.post(url, data)
+        response = self.session.post(url, data, timeout=self.timeout)
         response.raise_for_status()
         token = response.json()
         response.close()
@@ -88,177 +184,273 @@ class MALClient:
     def hash_list(mal_list):
         return hashlib.sha256(json.dumps(mal_list['data'], sort_keys=True).encode()).hexdigest()
 
-    def get_mal_list(self):
+    def iter_list_pages(self, page_size=1000):
         url = f'https://api.myanimelist.net/v2/users/{self.user_name}/animelist'
-        headers = {'Authorization': f'Bearer {self.MAL_ACCESS_TOKEN}'}
-        params = {'limit': 1000}
-        r = requests.get(url, headers=headers, params=params)
-        mal_list = r.json()
+        # node.id, node.main_picture and list_status.updated_at are the only parts of an entry we use
+        params = {'limit': page_size, 'fields': 'main_picture,list_status{updated_at}'}
+        while url:
+            r = self.api_get(url, params=params)
+            r.raise_for_status()
+            page = r.json()
+            r.close()
+            yield page['data']
+            # paging.next already carries limit, offset and fields
+            url = page.get('paging', {}).get('next')
+            params = None
 
-        if r.ok:
-            self.logger.info('List successfully found')
-            mal_list_path = f'{self.responses_dir}/mal_list.json'
-            hash_path = f'{self.responses_dir}/hash.txt'
-            if not os.path.exists(mal_list_path):
-                self.logger.info('No list found, creating new')
-                try:
-                    with open(hash_path, 'w') as f:
-                        f.write(self.hash_list(mal_list))
-                except IOError as e:
-                    self.logger.error(f"Error writing hash to {hash_path}: {e}")
-                    return
+    @staticmethod
+    def fingerprint(entry):
+        return entry.get('list_status', {}).get('updated_at')
 
-                try:
-                    with open(mal_list_path, 'w') as f:
-                        json.dump(mal_list, f, indent=2)
-                except IOError as e:
-                    self.logger.error(f"Error writing list to {mal_list_path}: {e}")
-                    return
+    def load_list_index(self):
+        index_path = f'{self.responses_dir}/list_index.json'
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (IOError, json.JSONDecodeError) as e:
+            self.logger.error(f"Error reading list index from {index_path}: {e}")
+            return {}
+
+    def save_list_index(self, index):
+        index_path = f'{self.responses_dir}/list_index.json'
+        fd, tmp_path = tempfile.mkstemp(dir=self.responses_dir, suffix='.part')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(index, f, ensure_ascii=False)
+            os.replace(tmp_path, index_path)
+        except IOError as e:
+            os.remove(tmp_path)
+            self.logger.error(f"Error writing list index to {index_path}: {e}")
+
+    def confirm_list_entries(self, fingerprints):
+        # Changed entries only take their new fingerprint once their info is stored
+        index = self.load_list_index()
+        for anime_id, fingerprint in fingerprints.items():
+            entry = index.get(str(anime_id))
+            if entry is not None:
+                entry[0] = fingerprint
+        self.save_list_index(index)
 
-                self.logger.info('New list saved')
+    def get_mal_list(self):
+        mal_list_path = f'{self.responses_dir}/mal_list.json'
+        old_index = self.load_list_index()
 
-            else:
-                self.logger.info('Checking for updates')
+        # Stream each page into a temp file so only one page is held in memory however
+        # long the list is, and fingerprint every entry on the way through
+        new_index = {}
+        diff = ListDiff()
+        fd, tmp_path = tempfile.mkstemp(dir=self.responses_dir, suffix='.part')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write('{"data": [\n')
+                for page in self.iter_list_pages():
+                    for entry in page:
+                        if new_index:
+                            f.write(',\n')
+                        f.write(json.dumps(entry, ensure_ascii=False))
+
+                        anime_id = str(entry['node']['id'])
+                        fingerprint = self.fingerprint(entry)
+                        picture = entry['node'].get('main_picture', {}).get('large')
+                        new_index[anime_id] = [fingerprint, picture]
+
+                        old = old_index.get(anime_id)
+                        if old is None:
+                            diff.added.add(int(anime_id))
+                        elif old[0] != fingerprint:
+                            diff.changed.add(int(anime_id))
+                    self.logger.debug('Fetched list page, %d entries so far', len(new_index))
+                f.write('\n]}\n')
+        except requests.RequestException as e:
+            os.remove(tmp_path)
+            self.logger.error(f"Error fetching list: {e}")
+            return None
+        except IOError as e:
+            os.remove(tmp_path)
+            self.logger.error(f"Error writing list to {tmp_path}: {e}")
+            return None
 
-                new_hash = self.hash_list(mal_list)
+        diff.removed = {int(anime_id) for anime_id in old_index.keys() - new_index.keys()}
+        self.logger.info(f'List successfully found ({len(new_index)} entries): {diff!r}')
 
-                try:
-                    with open(hash_path, 'r') as f:
-                        old_hash = f.read()
-                except IOError as e:
-                        self.logger.error(f"Error reading hash from {hash_path}: {e}")
-                        return
-
-                if new_hash != old_hash:
-                    self.logger.info('Update found, saving new list')
-                    try:
-                        with open(mal_list_path, 'w') as f:
-                            json.dump(mal_list, f, indent=2)
-                            self.logger.info('New list saved')
-                    except IOError as e:
-                        self.logger.error(f"Error writing list to {mal_list_path}: {e}")
-                        return
+        if not diff and os.path.exists(mal_list_path):
+            os.remove(tmp_path)
+            self.logger.info('No update found')
+            return diff
 
-                    try:
-                        with open(hash_path, 'w') as f:
-                            f.write(new_hash)
-                    except IOError as e:
-                        self.logger.error(f"Error writing hash to {hash_path}: {e}")
-                        return
+        try:
+            os.replace(tmp_path, mal_list_path)
+        except IOError as e:
+            os.remove(tmp_path)
+            self.logger.error(f"Error writing list to {mal_list_path}: {e}")
+            return None
+        # Changed entries are saved with their old fingerprint, so a run that dies
+        # before re-fetching them still sees them as changed next time. Added
+        # entries need no such care: missing covers and info are worked out from
+        # what is on disk and in the info store, not from the diff
+        for anime_id in diff.changed:
+            diff.fingerprints[anime_id] = new_index[str(anime_id)][0]
+            new_index[str(anime_id)][0] = old_index[str(anime_id)][0]
+        self.save_list_index(new_index)
+        self.logger.info('New list saved')
+        return diff
+
+    def download_images(self, diff=None, progress=None):
+        jobs = []
+        if diff is not None:
+            # Any listed entry without a cover on disk, including ones an earlier,
+            # interrupted sync never got to
+            on_disk = {entry.name for entry in os.scandir(self.images_dir)}
+            for anime_id, (_, picture) in self.load_list_index().items():
+                if f'{anime_id}.jpg' in on_disk:
+                    continue
+                if picture:
+                    jobs.append((int(anime_id), picture))
                 else:
-                    self.logger.info('No update found')
+                    self.logger.warning(f'No picture listed for {anime_id}, skipping')
         else:
+            mal_list_path = f'{self.responses_dir}/mal_list.json'
             try:
-                r.raise_for_status()
-            except requests.HTTPError as e:
-                self.logger.error(f"Error fetching list: {e}")
+                with open(mal_list_path, 'r') as f:
+                    mal_list = json.load(f)
+            except FileNotFoundError as e:
+                self.logger.error(f"Error opening list file: {e}")
+                return
+            except IOError as e:
+                self.logger.error(f"Error reading list file: {e}")
                 return
 
-    def download_image(self, image_url, anime_id):
-        r = requests.get(image_url)
-        if r.ok:
-            self.logger.debug(f'Image downloaded successfully: {anime_id}')
-            with open(f'{self.images_dir}/{anime_id}.jpg', 'wb') as f:
-                f.write(r.content)
-            return False
-        else:
-            self.logger.warning(f'Error downloading image: {anime_id}->{r.status_code}')
-            return True
-
-    def download_images(self):
-        mal_list_path = f'{self.responses_dir}/mal_list.json'
-        try:
-            with open(mal_list_path, 'r') as f:
-                mal_list = json.load(f)
-        except FileNotFoundError as e:
-            self.logger.error(f"Error opening list file: {e}")
-            return
-        except IOError as e:
-            self.logger.error(f"Error reading list file: {e}")
-            return
+            for anime in mal_list['data']:
+                anime_id = anime["node"]["id"]
+                img_path = f'{self.images_dir}/{anime_id}.jpg'
+                if not os.path.exists(img_path):
+                    try:
+                        jobs.append((anime_id, anime['node']['main_picture']['large']))
+                    except KeyError:
+                        self.logger.warning(f'No picture listed for {anime_id}, skipping')
 
-        for anime in mal_list['data']:
-            anime_id = anime["node"]["id"]
-            img_path = f'{self.images_dir}/{anime_id}.jpg'
-            if not os.path.exists(img_path):
-                self.logger.info(f'Downloading image: {anime_id}')
-                image_url = anime['node']['main_picture']['large']
-                download_error = self.download_image(image_url, anime_id)
-                if download_error:
-                    break
-                sleep(0.30)
+        # Failed covers are still missing next time, so they are simply retried then
+        return self.downloader.download(jobs, progress=progress)
 
     def anime_info_query(self, anime_id):
         url = f'https://api.myanimelist.net/v2/anime/{anime_id}'
-        headers = {'Authorization': f'Bearer {self.MAL_ACCESS_TOKEN}'}
         params = {'fields': 'title,mean,rank,popularity,genres,start_season,opening_themes'}
-        r = requests.get(url, headers=headers, params=params)
+        self.api_limiter.acquire()
+        r = self.api_get(url, params=params)
         if r.ok:
-            self.logger.debug(f'Anime info found: {anime_id}')
+            self.logger.debug('Anime info found: %s', anime_id)
             return r.json()
         else:
             self.logger.error(f'Error: {r.status_code}')
             return None
 
-    def get_anime_info(self):
+    def get_anime_info(self, diff=None, progress=None, on_record=None):
         mal_list_path = f'{self.responses_dir}/mal_list.json'
-        info_json_path = f'{self.responses_dir}/info.json'
-        with open(mal_list_path, 'r') as f:
-            mal_list = json.load(f)
-
-        # Load or initialize info_dict
-        if os.path.exists(info_json_path):
-            self.logger.info('Info file found, updating')
-            with open(info_json_path, 'r', encoding='utf-8') as f:
-                try:
-                    info_dict = json.load(f)
-                except json.JSONDecodeError:
-                    info_dict = {}
+        self.import_legacy_info()
+
+        if diff is not None:
+            # Every listed id without stored info, plus changed entries re-queried
+            # so their MAL metadata stays current
+            known = self.info_store.ids()
+            pending = [int(anime_id) for anime_id in self.load_list_index() if int(anime_id) not in known]
+            pending.extend(diff.changed - set(pending))
         else:
-            self.logger.info('No info file found, creating new')
-            info_dict = {}
-
-        updated = False
-        for anime in mal_list['data']:
-            anime_id = str(anime["node"]["id"])
-            if anime_id not in info_dict:
-                self.logger.info(f'Adding {anime_id} to info dict')
-                anime_info = self.anime_info_query(anime["node"]["id"])
-                if anime_info:
-                    info_dict[anime_id] = anime_info
-                    updated = True
-                sleep(0.30)
-
-        if updated or not os.path.exists(info_json_path):
-            with open(info_json_path, 'w', encoding='utf-8') as f:
-                json.dump(info_dict, f, ensure_ascii=False, indent=2)
+            with open(mal_list_path, 'r') as f:
+                mal_list = json.load(f)
+            known = self.info_store.ids()
+            pending = [anime["node"]["id"] for anime in mal_list['data']
+                       if anime["node"]["id"] not in known]
+
+        # Every record is written as soon as it arrives, so an interrupted
+        # run resumes with only the ids that are still missing
+        fetched = set()
+        if pending:
+            self.logger.info(f'Fetching info for {len(pending)} anime with {self.info_workers} workers')
+            with ThreadPoolExecutor(max_workers=self.info_workers, thread_name_prefix='anime-info') as pool:
+                futures = {pool.submit(self.anime_info_query, anime_id): anime_id for anime_id in pending}
+                for done, future in enumerate(as_completed(futures), 1):
+                    if self.cancelled.is_set():
+                        self.logger.info('Info fetch cancelled')
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        break
+
+                    anime_id = futures[future]
+                    if progress:
+                        progress(done, len(pending))
+                    try:
+                        anime_info = future.result()
+                    except requests.RequestException as e:
+                        self.logger.error(f'Error fetching info for {anime_id}: {e}')
+                        anime_info = None
+                    if not anime_info:
+                        continue
+
+                    self.logger.info('Adding %s to info store', anime_id)
+                    self.info_store.put(anime_id, anime_info)
+                    self._remember(AnimeInfo.from_dict(anime_info))
+                    fetched.add(anime_id)
+                    if on_record:
+                        on_record(anime_id)
+
+        # Failed and cancelled changed entries keep their old fingerprint and come
+        # back as changed; missing ones are picked up again from the info store
+        if diff is not None:
+            confirmed = {anime_id: fingerprint for anime_id, fingerprint in diff.fingerprints.items()
+                         if anime_id in fetched}
+            if confirmed:
+                self.confirm_list_entries(confirmed)
+
+    def import_legacy_info(self):
+        return self.info_store.import_json(f'{self.responses_dir}/info.json',
+                                           f'{self.responses_dir}/info.ndjson')
 
     def cache_info(self):
-        info_json_path = f'{self.responses_dir}/info.json'
-        try:
-            with open(info_json_path, 'r', encoding='utf-8') as f:
-                info = json.load(f)
-
-            self._info_dict = info
-            self.logger.info("Info dict cached successfully")
-
-        except FileNotFoundError:
-            self.logger.error("Info file not found")
+        # Records are read lazily by get_info; only a legacy info.json needs work here
+        self.import_legacy_info()
+        self.logger.info(f"Info store ready with {len(self.info_store)} records")
+
+    def _remember(self, info):
+        self._info_dict[str(info.id)] = info
+        if self._opening_index is not None:
+            self._opening_index.add(info)
+
+    def opening_index(self):
+        # Title lookups need every record, so the first call loads the whole store;
+        # only bulk imports ask for it, the UI goes through get_info
+        if self._opening_index is None:
+            self.import_legacy_info()
+            self._opening_index = OpeningIndex()
+            for anime_id, info in self.info_store.iter_all():
+                self._remember(AnimeInfo.from_dict(info))
+            self.logger.info(f"Opening index built: {len(self._opening_index)} openings")
+        return self._opening_index
+
+    def has_info(self, id):
+        return str(id) in self._info_dict or id in self.info_store
 
     def get_info(self, id):
         try:
             info = self._info_dict[str(id)]
             return info
         except KeyError:
-           self.logger.error(f'Anime info not found for {id}')
+            info = self.info_store.get(id)
+            if info is None:
+                self.logger.error(f'Anime info not found for {id}')
+                return None
+            info = AnimeInfo.from_dict(info)
+            self._remember(info)
+            return info
 
 
 if __name__ == '__main__':
+    metrics.configure_from_env()
     client = MALClient()
     if client.is_valid_token():
-        client.get_mal_list()
-        client.download_images()
-        client.get_anime_info()
+        diff = client.get_mal_list()
+        client.download_images(diff)
+        client.get_anime_info(diff)
         client.cache_info()
         print(client.get_info(5081))
     else:
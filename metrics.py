@@ -0,0 +1,145 @@
+import atexit
+import functools
+import json
+import os
+import threading
+from contextlib import contextmanager
+from time import perf_counter, time
+
+from logger import get_logger
+
+# TIERLIST_METRICS=<path>.json|<path>.prom writes a snapshot on exit.
+# TIERLIST_PROFILE=cprofile,tracemalloc turns on the matching capture; results
+# go to tierlist.prof and tracemalloc.txt in the working directory.
+METRICS_ENV = 'TIERLIST_METRICS'
+PROFILE_ENV = 'TIERLIST_PROFILE'
+PREFIX = 'tierlist'
+
+_lock = threading.Lock()
+_counters = {}
+_timers = {}
+_profiler = None
+_configured = False
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def incr(name, value=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, seconds, **labels):
+    key = _key(name, labels)
+    with _lock:
+        timer = _timers.get(key)
+        if timer is None:
+            _timers[key] = [1, seconds, seconds, seconds]
+        else:
+            timer[0] += 1
+            timer[1] += seconds
+            timer[2] = min(timer[2], seconds)
+            timer[3] = max(timer[3], seconds)
+
+
+@contextmanager
+def span(name, **labels):
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, perf_counter() - start, **labels)
+
+
+def timed(name, **labels):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def snapshot():
+    with _lock:
+        counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in _counters.items()]
+        timers = [{'name': name, 'labels': dict(labels), 'count': count, 'sum': total, 'min': low, 'max': high}
+                  for (name, labels), (count, total, low, high) in _timers.items()]
+    return {'timestamp': time(), 'counters': counters, 'timers': timers}
+
+
+def _prometheus_labels(labels):
+    if not labels:
+        return ''
+    escaped = {key: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for key, value in labels.items()}
+    pairs = ','.join(f'{key}="{value}"' for key, value in sorted(escaped.items()))
+    return '{' + pairs + '}'
+
+
+def to_prometheus(snap=None):
+    snap = snap or snapshot()
+    lines = []
+    for counter in sorted(snap['counters'], key=lambda c: c['name']):
+        lines.append(f"{PREFIX}_{counter['name']}_total{_prometheus_labels(counter['labels'])} {counter['value']}")
+    for timer in sorted(snap['timers'], key=lambda t: t['name']):
+        name = f"{PREFIX}_{timer['name']}_seconds"
+        labels = _prometheus_labels(timer['labels'])
+        lines.append(f"{name}_count{labels} {timer['count']}")
+        lines.append(f"{name}_sum{labels} {timer['sum']:.6f}")
+        lines.append(f"{name}_max{labels} {timer['max']:.6f}")
+    return '\n'.join(lines) + '\n'
+
+
+def export(path):
+    snap = snapshot()
+    with open(path, 'w', encoding='utf-8') as f:
+        if path.endswith('.prom'):
+            f.write(to_prometheus(snap))
+        else:
+            json.dump(snap, f, indent=2)
+    get_logger(__name__).info(f"Metrics written to {path}")
+
+
+def _stop_profiling():
+    logger = get_logger(__name__)
+    if _profiler is not None:
+        _profiler.disable()
+        _profiler.dump_stats('tierlist.prof')
+        logger.info("cProfile stats written to tierlist.prof")
+
+    import tracemalloc
+    if tracemalloc.is_tracing():
+        stats = tracemalloc.take_snapshot().statistics('lineno')
+        with open('tracemalloc.txt', 'w', encoding='utf-8') as f:
+            for stat in stats[:50]:
+                f.write(f"{stat}\n")
+        tracemalloc.stop()
+        logger.info("tracemalloc top allocations written to tracemalloc.txt")
+
+
+def configure_from_env():
+    global _profiler, _configured
+    if _configured:
+        return
+    _configured = True
+
+    profile = {mode.strip() for mode in os.getenv(PROFILE_ENV, '').split(',') if mode.strip()}
+    if 'tracemalloc' in profile:
+        import tracemalloc
+        tracemalloc.start(25)
+    if 'cprofile' in profile:
+        import cProfile
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    if profile:
+        atexit.register(_stop_profiling)
+
+    path = os.getenv(METRICS_ENV)
+    if path:
+        atexit.register(export, path)
@@ -0,0 +1,72 @@
+import threading
+
+from logger import get_logger
+
+
+class SyncWorker(threading.Thread):
+    # Runs the MAL sync off the Tk thread. Everything the UI needs is put on
+    # `events` as tuples and drained by the Tk thread with after():
+    #   ('progress', stage, done, total)
+    #   ('anime', anime_id)   cover and info are both on disk
+    #   ('done', message)
+    # Newly fetched openings are added to the search index here as well, so the
+    # Tk thread never waits on that write
+    def __init__(self, client, events, database=None):
+        super().__init__(name='mal-sync', daemon=True)
+        self.client = client
+        self.events = events
+        self.db = database
+        self.logger = get_logger(__name__)
+
+    def cancel(self):
+        self.logger.info('Sync cancel requested')
+        self.client.cancel()
+
+    def progress(self, stage):
+        return lambda done, total: self.events.put(('progress', stage, done, total))
+
+    def run(self):
+        try:
+            message = self.sync()
+        except Exception as e:
+            self.logger.error(f'MAL sync failed: {e}')
+            message = f'Sync failed: {e}'
+        self.events.put(('done', message))
+
+    def sync(self):
+        cancelled = self.client.cancelled
+
+        self.events.put(('progress', 'Checking access token', 0, 0))
+        if not self.client.is_valid_token():
+            self.logger.warning("Invalid access token")
+            return 'Invalid access token'
+
+        self.events.put(('progress', 'Syncing list', 0, 0))
+        diff = self.client.get_mal_list()
+        if cancelled.is_set():
+            return 'Sync cancelled'
+
+        report = self.client.download_images(diff, progress=self.progress('Downloading covers'))
+        if report:
+            # Covers whose info is already cached can be shown straight away
+            for anime_id in report.downloaded:
+                if self.client.has_info(anime_id):
+                    self.events.put(('anime', anime_id))
+        if cancelled.is_set():
+            return 'Sync cancelled'
+
+        fetched = []
+
+        def on_record(anime_id):
+            fetched.append(anime_id)
+            self.events.put(('anime', anime_id))
+
+        self.client.get_anime_info(diff, progress=self.progress('Fetching anime info'), on_record=on_record)
+        # Also done after a cancel, so whatever was fetched is searchable
+        if self.db is not None and fetched:
+            self.db.index_openings(filter(None, map(self.client.get_info, fetched)))
+        if cancelled.is_set():
+            return 'Sync cancelled'
+
+        self.logger.info("MAL Initialization Finished")
+        return 'Sync finished'
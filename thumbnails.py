@@ -0,0 +1,242 @@
+import glob
+import heapq
+import os
+import threading
+from collections import OrderedDict
+
+from customtkinter import CTkImage
+from PIL import Image
+
+from logger import get_logger
+import metrics
+
+THUMB_SIZE = (106, 150)
+PLACEHOLDER_COLOR = '#24496b'
+
+
+class ThumbnailCache:
+    def __init__(self, images_dir='images', cache_dir='Thumbnails', size=THUMB_SIZE, max_items=512):
+        self.images_dir = images_dir
+        self.cache_dir = cache_dir
+        self.size = size
+        self.max_items = max_items
+        self.logger = get_logger(__name__)
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+        self._placeholder = None
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def source_path(self, anime_id):
+        return os.path.join(self.images_dir, f'{anime_id}.jpg')
+
+    def thumb_path(self, anime_id, mtime_ns):
+        return os.path.join(self.cache_dir, f'{anime_id}_{mtime_ns}.jpg')
+
+    def _build_thumbnail(self, anime_id, source, mtime_ns):
+        path = self.thumb_path(anime_id, mtime_ns)
+        if os.path.exists(path):
+            # Decode now rather than on first use, which may be on the Tk thread
+            with metrics.span('image_decode', source='thumbnail'):
+                thumb = Image.open(path)
+                thumb.load()
+            return thumb
+
+        # Older thumbnails of this cover were made from a previous download
+        self._remove_thumbnails(anime_id)
+        with metrics.span('image_decode', source='cover'), Image.open(source) as pil_image:
+            # JPEG draft mode decodes straight at 1/2, 1/4 or 1/8 scale, as long
+            # as the result is still at least the thumbnail size
+            pil_image.draft('RGB', self.size)
+            thumb = pil_image.convert('RGB').resize(self.size, Image.LANCZOS)
+        tmp_path = f'{path}.part'
+        thumb.save(tmp_path, 'JPEG', quality=90)
+        os.replace(tmp_path, path)
+        self.logger.debug('Thumbnail created: %s', anime_id)
+        return thumb
+
+    def _remove_thumbnails(self, anime_id):
+        for stale in glob.glob(os.path.join(self.cache_dir, f'{anime_id}_*.jpg')):
+            try:
+                os.remove(stale)
+            except OSError as e:
+                self.logger.warning(f'Error removing thumbnail {stale}: {e}')
+
+    def placeholder(self):
+        # One flat image shared by every cover that is still loading
+        if self._placeholder is None:
+            self._placeholder = CTkImage(Image.new('RGB', self.size, PLACEHOLDER_COLOR), size=self.size)
+        return self._placeholder
+
+    def cached(self, anime_id):
+        # The ready CTkImage if the LRU holds a current one, without touching the disk image
+        anime_id = str(anime_id)
+        try:
+            mtime_ns = os.stat(self.source_path(anime_id)).st_mtime_ns
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._images.get(anime_id)
+            if cached and cached[0] == mtime_ns:
+                self._images.move_to_end(anime_id)
+                metrics.incr('thumbnail_cache', result='hit')
+                return cached[1]
+        return None
+
+    def load(self, anime_id):
+        anime_id = str(anime_id)
+        source = self.source_path(anime_id)
+        mtime_ns = os.stat(source).st_mtime_ns
+        return self._build_thumbnail(anime_id, source, mtime_ns), mtime_ns
+
+    def get(self, anime_id):
+        anime_id = str(anime_id)
+        source = self.source_path(anime_id)
+        mtime_ns = os.stat(source).st_mtime_ns
+
+        with self._lock:
+            cached = self._images.get(anime_id)
+            if cached and cached[0] == mtime_ns:
+                self._images.move_to_end(anime_id)
+                metrics.incr('thumbnail_cache', result='hit')
+                return cached[1]
+
+        metrics.incr('thumbnail_cache', result='miss')
+
+        pil_image = self._build_thumbnail(anime_id, source, mtime_ns)
+        image = CTkImage(pil_image, size=self.size)
+        self.put(anime_id, mtime_ns, image)
+        return image
+
+    def put(self, anime_id, mtime_ns, image):
+        with self._lock:
+            self._images[str(anime_id)] = (mtime_ns, image)
+            self._images.move_to_end(str(anime_id))
+            while len(self._images) > self.max_items:
+                self._images.popitem(last=False)
+
+    def invalidate(self, anime_id):
+        anime_id = str(anime_id)
+        with self._lock:
+            self._images.pop(anime_id, None)
+        self._remove_thumbnails(anime_id)
+
+
+class ThumbnailLoader:
+    # Decodes covers on a pool of worker threads so scrolling and rebuilds never
+    # wait on JPEG decoding. Buttons get the placeholder at once; finished covers
+    # are handed to the Tk thread in batches by polling with after().
+    # Requests made during one Tk event (one grid render) share a generation,
+    # newer generations go first, and within one the bind order is kept, which
+    # VirtualGrid makes visible cells first.
+    def __init__(self, cache, workers=4, poll_ms=30, batch_size=32):
+        self.cache = cache
+        self.workers = workers
+        self.poll_ms = poll_ms
+        self.batch_size = batch_size
+        self.logger = get_logger(__name__)
+
+        self.root = None
+        self._heap = []
+        self._cond = threading.Condition()
+        self._state = {}      # anime_id -> 'queued' | 'loading'
+        self._callbacks = {}  # anime_id -> callbacks waiting for its cover
+        self._done = []
+        self._seq = 0
+        self._generation = 0
+        self._pass_open = False
+        self._polling = False
+        self._threads = []
+
+    def attach(self, root):
+        # Without a Tk root to poll from, covers are decoded synchronously
+        self.root = root
+        if not self._threads:
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'cover-decode-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def show(self, button, anime_id):
+        # Buttons are recycled while covers load, so a late cover only lands
+        # if the button is still showing the same anime
+        anime_id = str(anime_id)
+        button.cover_id = anime_id
+
+        def deliver(image):
+            if button.cover_id == anime_id:
+                button.configure(image=image)
+
+        button.configure(image=self.request(anime_id, deliver))
+
+    def request(self, anime_id, callback):
+        # Returns the image to show now and calls callback later if that was the placeholder
+        anime_id = str(anime_id)
+        image = self.cache.cached(anime_id)
+        if image is not None:
+            return image
+        if self.root is None:
+            return self.cache.get(anime_id)
+
+        if not self._pass_open:
+            self._generation += 1
+            self._pass_open = True
+            self.root.after_idle(self._close_pass)
+        self._callbacks.setdefault(anime_id, []).append(callback)
+        with self._cond:
+            if self._state.get(anime_id) != 'loading':
+                # A repeat request just re-queues at the newer priority; the
+                # older heap entry is skipped when it comes up
+                self._state[anime_id] = 'queued'
+                self._seq += 1
+                heapq.heappush(self._heap, (-self._generation, self._seq, anime_id))
+                self._cond.notify()
+
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_ms, self._poll)
+        return self.cache.placeholder()
+
+    def _close_pass(self):
+        self._pass_open = False
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while True:
+                    while not self._heap:
+                        self._cond.wait()
+                    _, _, anime_id = heapq.heappop(self._heap)
+                    if self._state.get(anime_id) == 'queued':
+                        self._state[anime_id] = 'loading'
+                        break
+            try:
+                pil_image, mtime_ns = self.cache.load(anime_id)
+            except Exception as e:
+                self.logger.error(f'Error loading cover {anime_id}: {e}')
+                pil_image, mtime_ns = None, None
+            with self._cond:
+                self._done.append((anime_id, mtime_ns, pil_image))
+
+    def _poll(self):
+        with self._cond:
+            batch, self._done = self._done[:self.batch_size], self._done[self.batch_size:]
+            for anime_id, _, _ in batch:
+                self._state.pop(anime_id, None)
+            busy = bool(self._state) or bool(self._done)
+
+        for anime_id, mtime_ns, pil_image in batch:
+            callbacks = self._callbacks.pop(anime_id, [])
+            if pil_image is None:
+                continue
+            # CTkImage is only ever built here, on the Tk thread
+            image = CTkImage(pil_image, size=self.cache.size)
+            self.cache.put(anime_id, mtime_ns, image)
+            for callback in callbacks:
+                callback(image)
+        if batch:
+            metrics.incr('covers_delivered', len(batch))
+
+        if busy:
+            self.root.after(self.poll_ms, self._poll)
+        else:
+            self._polling = False
@@ -0,0 +1,75 @@
+import json
+import os
+
+from logger import get_logger
+
+# TIERLIST_TIER_CONFIG=<path> points at a JSON file such as
+# {"thresholds": {"S": 36, "A": 30, "B": 24}, "weights": {"score_mus": 1.5}};
+# anything left out keeps its default. Tiers below the last threshold are C.
+CONFIG_ENV = 'TIERLIST_TIER_CONFIG'
+DEFAULT_PATH = 'tier_config.json'
+TIERS = ("S", "A", "B", "C")
+SCORE_FIELDS = ('score_v', 'score_mus', 'score_n', 'score_mem')
+DEFAULT_THRESHOLDS = {"S": 36, "A": 30, "B": 24}
+
+
+class TierConfig:
+    def __init__(self, thresholds=None, weights=None):
+        self.thresholds = dict(DEFAULT_THRESHOLDS)
+        self.thresholds.update(thresholds or {})
+        self.weights = {field: 1 for field in SCORE_FIELDS}
+        self.weights.update(weights or {})
+
+        unknown = (set(self.thresholds) - set(TIERS[:-1])) | (set(self.weights) - set(SCORE_FIELDS))
+        if unknown:
+            raise ValueError(f"Unknown tier config keys: {sorted(unknown)}")
+        cutoffs = [self.thresholds[tier] for tier in TIERS[:-1]]
+        if cutoffs != sorted(cutoffs, reverse=True):
+            raise ValueError(f"Tier thresholds must decrease from S to B, got {self.thresholds}")
+
+    @classmethod
+    def load(cls, path=None):
+        path = path or os.getenv(CONFIG_ENV, DEFAULT_PATH)
+        if not os.path.exists(path):
+            return cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        get_logger(__name__).info(f"Loaded tier config from {path}")
+        return cls(config.get('thresholds'), config.get('weights'))
+
+    @classmethod
+    def from_json(cls, text):
+        config = json.loads(text)
+        return cls(config.get('thresholds'), config.get('weights'))
+
+    def to_json(self):
+        return json.dumps({'thresholds': self.thresholds, 'weights': self.weights}, sort_keys=True)
+
+    def total(self, scores):
+        return sum(self.weights[field] * score for field, score in zip(SCORE_FIELDS, scores))
+
+    def tier_for(self, total_score):
+        for tier in TIERS[:-1]:
+            if total_score >= self.thresholds[tier]:
+                return tier
+        return TIERS[-1]
+
+    def total_sql(self):
+        # Expression and parameters computing total_score from the score columns
+        return ' + '.join(f'{field} * ?' for field in SCORE_FIELDS), [self.weights[field] for field in SCORE_FIELDS]
+
+    def tier_sql(self, total_expr, total_params):
+        # CASE over the same expression, highest tier first, as tier_for does
+        sql, params = 'CASE', []
+        for tier in TIERS[:-1]:
+            sql += f' WHEN ({total_expr}) >= ? THEN ?'
+            params += total_params + [self.thresholds[tier], tier]
+        return sql + ' ELSE ? END', params + [TIERS[-1]]
+
+    def __eq__(self, other):
+        if not isinstance(other, TierConfig):
+            return NotImplemented
+        return self.thresholds == other.thresholds and self.weights == other.weights
+
+    def __repr__(self):
+        return f"TierConfig(thresholds={self.thresholds}, weights={self.weights})"
@@ -1,72 +1,77 @@
+from time import perf_counter
+started = perf_counter()
+
 import tkinter as tk
+from tkinter import messagebox
 import customtkinter as ctk
-from customtkinter import CTkImage
 from mal_request import MALClient
-from PIL import Image
 from logger import get_logger
 from db_ops import db
+from tier_config import TierConfig
+from anime_info import SEASONS
+from thumbnails import ThumbnailCache, ThumbnailLoader
+from virtual_grid import VirtualGrid
+from sync_worker import SyncWorker
+from db_writer import DBWriter
+import metrics
+import bisect
 import os
+import queue
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 db = db()
 client = MALClient()
+thumbnails = ThumbnailCache()
+client.downloader.on_saved = thumbnails.invalidate
+covers = ThumbnailLoader(thumbnails)
 logger = get_logger(__name__)
 
+COVER_NAME = re.compile(r'(\d+)\.jpg')
+
 class TopButtonFrame(ctk.CTkFrame):
     def __init__(self, parent, tier, fgcolor):
         super().__init__(parent, fg_color=fgcolor, corner_radius=0)
         self.tier = tier
         self.fgcolor = fgcolor
 
-        self.canvas = tk.Canvas(self, highlightthickness=0, height=180, bg=fgcolor)  # height as needed
-        self.scrollbar = tk.Scrollbar(self, orient="horizontal", command=self.canvas.xview)
-        self.inner_frame = ctk.CTkFrame(self.canvas, fg_color=fgcolor, corner_radius=0)
-
-        self.inner_frame_id = self.canvas.create_window((0, 0), window=self.inner_frame, anchor="nw")
-        self.canvas.configure(xscrollcommand=self.scrollbar.set)
-
-        self.canvas.pack(side="top", fill="both", expand=True)
-        self.scrollbar.pack(side="bottom", fill="x")
-
-        # Configure resizing
-        self.inner_frame.bind("<Configure>", self._on_frame_configure)
+        # Only the covers scrolled into view get a widget; the rest are plain rows
+        self.row_grid = VirtualGrid(
+            self,
+            bind_cell=self._bind_cell,
+            fg_color=fgcolor,
+            orientation="horizontal",
+            button_kwargs={"fg_color": fgcolor, "hover_color": fgcolor}
+        )
+        self.row_grid.pack(fill="both", expand=True)
 
         self.create_image_buttons(tier, fgcolor)
 
-    def _on_frame_configure(self, event):
-        # Update scrollregion to match the true size of the inner_frame
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+    @staticmethod
+    def _bind_cell(image_button, result):
+        image_button.info = result
+        covers.show(image_button, result['a_id'])
+        image_button.configure(command=lambda info=result:
+        logger.info(f"Name: {info['song_title']}; Total Score: {info['total_score']}; Visual Score: {info['score_v']}; Music Score: {info['score_mus']}; Narrative Score: {info['score_n']}; Memorability Score: {info['score_mem']}"))
 
-    def create_image_buttons(self, tier, color):
-        # Remove previous widgets
-        for widget in self.inner_frame.winfo_children():
-            if widget != getattr(self, 'tier_label', None):
-                widget.destroy()
+    def set_matches(self, matches):
+        self.row_grid.set_filter(None if matches is None else lambda result: result['song_title'] in matches)
 
+    @metrics.timed('ui_rebuild', frame='top')
+    def create_image_buttons(self, tier, color):
+        # Rows come back already ordered by total_score, highest first
         results = db.find_tier(tier)
-        if not results:
-            return
+        self.row_grid.set_items(results or [])
 
-        # Sort by sum of indices 10-13, descending
-        results = sorted(results, key=lambda item: sum(item[10:14]), reverse=True)
-
-        for col, result in enumerate(results):
-            pil_image = Image.open(f"images/{result[3]}.jpg")
-            image = CTkImage(pil_image, size=(106, 150))
-            image_button = ctk.CTkButton(
-                self.inner_frame,
-                image=image,
-                text="",
-                fg_color=color,
-                width=0,
-                hover_color=color
-            )
-            image_button.info = result
-            image_button.configure(command=lambda info=image_button.info:
-            logger.info(f"Name: {info[1]}; Total Score: {sum(info[10:14])}; Music Score: {info[10]}; Visual Score: {info[11]}; Narrative Score: {info[12]}; Memorability Score: {info[13]}"))
-
-            image_button.grid(row=0, column=col, pady=1, padx=1, sticky="n")
+    def insert_result(self, result):
+        # Equal scores go after the existing ones, matching a fresh find_tier
+        index = bisect.bisect_right(self.row_grid.all_items, -result['total_score'],
+                                    key=lambda item: -item['total_score'])
+        self.row_grid.insert_item(index, result)
 
+    def remove_result(self, result):
+        return self.row_grid.remove_item(result)
 
 
 class TierFrame(ctk.CTkFrame):
@@ -102,16 +107,23 @@ class TopFrame(ctk.CTkFrame):
         self.tier_frameC = TierFrame(self, fg_color="#24496b", tier="C")
         self.tier_frameC.grid(row=3, column=0, sticky="nsew")
 
+        self.tier_frames = {
+            "S": self.tier_frameS,
+            "A": self.tier_frameA,
+            "B": self.tier_frameB,
+            "C": self.tier_frameC,
+        }
+
         self.grid_rowconfigure("all", weight=1)
         self.grid_columnconfigure(0, weight=1)
 
 
-class BottomFrame(ctk.CTkScrollableFrame):
+class BottomFrame(ctk.CTkFrame):
     def __init__(self, parent):
         super().__init__(parent, fg_color="#071f35", corner_radius=0)
 
 
-        def show_popup(info, refresh):
+        def show_popup(info, openings, on_rated):
             popup = ctk.CTkToplevel(self)
             popup.title("Anime Info")
             popup.geometry("850x400")
@@ -122,7 +134,7 @@ class BottomFrame(ctk.CTkScrollableFrame):
             popup.lift()  # Bring popup to front
             popup.focus()  # Focus on the popup
 
-            name_label = ctk.CTkLabel(popup, text=info['title'], font=("Arial", 22), fg_color="#f4acb7")
+            name_label = ctk.CTkLabel(popup, text=info.title, font=("Arial", 22), fg_color="#f4acb7")
             name_label.configure(
                 compound="left",
                 text_color="#9d8189"
@@ -183,18 +195,17 @@ class BottomFrame(ctk.CTkScrollableFrame):
                 
                 def on_submit():
                     scores = [int(visual_score_var.get()), int(music_score_var.get()), int(narrative_score_var.get()), int(memorability_score_var.get())]
-                    db.insert_data(opening_text, info, scores)
                     popup.destroy()
-                    refresh()
+                    on_rated(opening_text, scores)
 
                 submit_btn = ctk.CTkButton(form_frame, text="Submit", command=on_submit, fg_color='#ffb3c6', hover_color='#ff8fab', text_color="#9d8189")
                 submit_btn.grid(row=4, column=0, columnspan=2, pady=(15, 5))
 
             row_num = 0
-            for opening in info['opening_themes']:
+            for opening in openings:
                 opening_button = ctk.CTkButton(
                     openings_scrollable,
-                    text=opening['text'],
+                    text=opening.title,
                     font=("Arial", 16),
                     text_color="#9d8189",
                     fg_color="#ffcad4",
@@ -208,96 +219,484 @@ class BottomFrame(ctk.CTkScrollableFrame):
             form_frame = ctk.CTkFrame(popup, fg_color="#ffe5d9", corner_radius=0)
             form_frame.place(relx=0, rely=0.3, relwidth=1, relheight=0.7)
 
-        def refresh_images(self):
-            create_image_buttons(self)
-            app.top_frame.tier_frameS.button_frame.create_image_buttons("S",
-                                                                        app.top_frame.tier_frameS.button_frame.fgcolor)
-            app.top_frame.tier_frameA.button_frame.create_image_buttons("A",
-                                                                        app.top_frame.tier_frameA.button_frame.fgcolor)
-            app.top_frame.tier_frameB.button_frame.create_image_buttons("B",
-                                                                        app.top_frame.tier_frameB.button_frame.fgcolor)
-            app.top_frame.tier_frameC.button_frame.create_image_buttons("C",
-                                                                        app.top_frame.tier_frameC.button_frame.fgcolor)
-
+        def on_rated(item, opening, scores):
+            # Only the rated opening changed, so patch the two affected views in place
+            # straight away; the writer thread saves it and App undoes this on failure
+            anime_id, info, openings = item
+            result = db.preview(opening.title, info, scores)
+            openings.remove(opening)
+            if not openings:
+                self.pool_grid.remove_item(item)
+            app.top_frame.tier_frames[result['tier']].button_frame.insert_result(result)
+            app.writer.submit((item, opening, result), opening.title, info, scores)
+
+        def restore_opening(item, opening):
+            # Puts back an opening whose rating could not be saved
+            anime_id, info, openings = item
+            openings.append(opening)
+            if len(openings) == 1:
+                self.pool_grid.extend_items([item])
+
+        def bind_cell(image_button, item):
+            anime_id, info, openings = item
+            image_button.info_dict = info
+            covers.show(image_button, anime_id)
+            image_button.configure(command=lambda: show_popup(info, openings, lambda opening, scores: on_rated(item, opening, scores)))
+
+        def build_item(anime_id, rated):
+            info = client.get_info(anime_id)
+            if info is None:
+                logger.error(f"No info for {anime_id}; Moving to next image")
+                return None
+
+            #stop condition here
+            # Each pool entry owns its list of unrated openings; rating one removes it from here
+            filtered_openings = [opening for opening in info.openings
+                                 if opening.title not in rated]
+            if not filtered_openings:
+                return None
+            return anime_id, info, filtered_openings
+
+        @metrics.timed('ui_rebuild', frame='bottom')
         def create_image_buttons(self):
-            for widget in self.winfo_children():
-                widget.destroy()
-
-            def edit_opening_s(opening_text):
-                for opening in opening_text:
-                   opening['text'] = re.sub(r'\([^()]*\)|#.*?: ', '', opening['text'])
-
-            MAX_PER_ROW = 10  # Set how many buttons per row
-            row = 0
-            col = 0
+            rated = db.rated_titles()
 
+            # Collect the unrated pool as data; the grid only builds widgets for visible rows
+            items = []
             for entry in os.scandir("images"):
-                if entry.is_file():
-                    pil_image = Image.open(entry.path)
-                    image = CTkImage(pil_image, size=(106, 150))
-                    image_button = ctk.CTkButton(
-                        self,
-                        image=image,
-                        text="",
-                        fg_color="#071f35",  # Use background color, not "transparent",
-                        width=0,
-                        hover_color="#071f35"
-                    )
-                    image_button.info_dict = client.get_info(entry.name.replace(".jpg", ""))
-                    try:
-                        edit_opening_s(image_button.info_dict['opening_themes'])
-                    except KeyError as e:
-                        logger.error(f"KeyError on {entry.name.replace(".jpg", "")}: {e}; Moving to next image")
-                        continue
-
-
-                    #stop condition here
-                    filtered_openings = [opening for opening in image_button.info_dict['opening_themes']
-                                         if not db.find_if_exists(opening['text'])]
-                    if not filtered_openings:
-                        continue
-                    image_button.info_dict['opening_themes'] = filtered_openings
-
-                    image_button.configure(command=lambda info=image_button.info_dict: show_popup(info, lambda: refresh_images(self)))
-
-                    image_button.grid(row=row, column=col, pady=1, padx=1)
-                    col += 1
-
-                    # Move to the next row if MAX_PER_ROW is reached
-                    if col >= MAX_PER_ROW:
-                        col = 0
-                        row += 1
-
-                    self.grid_columnconfigure("all", weight=1)
+                # Skips the .part files an interrupted download leaves behind
+                match = COVER_NAME.fullmatch(entry.name)
+                if match and entry.is_file():
+                    item = build_item(match[1], rated)
+                    if item:
+                        items.append(item)
+
+            self.pool_grid.set_items(items)
+
+        def add_anime(anime_ids):
+            # Called with batches of ids the background sync has finished
+            rated = db.rated_titles()
+            shown = {item[0] for item in self.pool_grid.all_items}
+            items = []
+            for anime_id in map(str, anime_ids):
+                if anime_id in shown or not os.path.exists(f"images/{anime_id}.jpg"):
+                    continue
+                item = build_item(anime_id, rated)
+                if item:
+                    items.append(item)
+                    shown.add(anime_id)
+            if items:
+                self.pool_grid.extend_items(items)
+
+        def set_matches(matches, facets=None):
+            # An anime stays in the pool while any of its unrated openings matches
+            # the search and the anime itself passes the genre/season filters
+            if matches is None and not facets:
+                self.pool_grid.set_filter(None)
+                return
+            self.pool_grid.set_filter(lambda item: (matches is None or any(opening.title in matches for opening in item[2]))
+                                      and (not facets or item[1].matches(**facets)))
+
+        self.add_anime = add_anime
+        self.restore_opening = restore_opening
+        self.set_matches = set_matches
+
+        self.pool_grid = VirtualGrid(
+            self,
+            bind_cell=bind_cell,
+            fg_color="#071f35",
+            max_per_row=10,  # Set how many buttons per row
+            button_kwargs={"fg_color": "#071f35", "hover_color": "#071f35"}  # Use background color, not "transparent"
+        )
+        self.pool_grid.pack(fill="both", expand=True)
 
         create_image_buttons(self)
 
 
 
+class SearchBar(ctk.CTkFrame):
+    DEBOUNCE_MS = 150
+
+    def __init__(self, parent, on_search):
+        super().__init__(parent, fg_color="#071f35", corner_radius=0)
+        self.on_search = on_search
+        self._pending = None
+        self._last = ""
+
+        # No textvariable: CTkEntry drops its placeholder when one is set
+        self.entry = ctk.CTkEntry(self, placeholder_text="Search songs, shows, genres")
+        self.entry.pack(side="left", fill="x", expand=True, padx=10, pady=2)
+        self.entry.bind("<KeyRelease>", lambda event: self._schedule())
+
+    def _schedule(self):
+        # Typing restarts the timer, so only the last keystroke of a burst searches
+        if self._pending is not None:
+            self.after_cancel(self._pending)
+        self._pending = self.after(self.DEBOUNCE_MS, self._run)
+
+    def _run(self):
+        # Keys that don't edit the text (arrows, shift) don't search again
+        self._pending = None
+        text = self.entry.get()
+        if text != self._last:
+            self._last = text
+            self.on_search(text)
+
+
+class FilterBar(ctk.CTkFrame):
+    ANY_GENRE, ANY_SEASON, ANY_YEAR = "+ Genre", "Any season", "Any year"
+
+    def __init__(self, parent, on_change):
+        super().__init__(parent, fg_color="#071f35", corner_radius=0)
+        self.on_change = on_change
+        self.genres = []
+        self.genre_options = set()
+        self.year_options = set()
+
+        menu_kwargs = {"fg_color": "#446d92", "button_color": "#24496b", "button_hover_color": "#24496b", "width": 110}
+        self.genre_menu = ctk.CTkOptionMenu(self, values=[self.ANY_GENRE], command=self._add_genre, **menu_kwargs)
+        self.genre_menu.pack(side="left", padx=(0, 5), pady=2)
+        self.season_menu = ctk.CTkOptionMenu(self, values=[self.ANY_SEASON, *SEASONS],
+                                             command=lambda value: self._changed(), **menu_kwargs)
+        self.season_menu.pack(side="left", padx=5, pady=2)
+        self.year_from_menu = ctk.CTkOptionMenu(self, values=[self.ANY_YEAR], command=lambda value: self._changed(), **menu_kwargs)
+        self.year_from_menu.pack(side="left", padx=5, pady=2)
+        self.year_to_menu = ctk.CTkOptionMenu(self, values=[self.ANY_YEAR], command=lambda value: self._changed(), **menu_kwargs)
+        self.year_to_menu.pack(side="left", padx=5, pady=2)
+
+        self.chips = ctk.CTkFrame(self, fg_color="#071f35", corner_radius=0)
+        self.chips.pack(side="left", fill="x", expand=True, padx=5)
+
+    def add_options(self, genres=(), years=()):
+        # Options only ever grow: the startup scan and every synced batch add theirs
+        genres, years = set(genres) - self.genre_options, set(years) - self.year_options
+        if genres:
+            self.genre_options |= genres
+            self.genre_menu.configure(values=[self.ANY_GENRE, *sorted(self.genre_options)])
+        if years:
+            self.year_options |= years
+            year_values = [self.ANY_YEAR, *map(str, sorted(self.year_options))]
+            self.year_from_menu.configure(values=year_values)
+            self.year_to_menu.configure(values=year_values)
+
+    def _add_genre(self, genre):
+        self.genre_menu.set(self.ANY_GENRE)
+        if genre == self.ANY_GENRE or genre in self.genres:
+            return
+        self.genres.append(genre)
+        self._changed()
+
+    def _remove_genre(self, genre):
+        self.genres.remove(genre)
+        self._changed()
+
+    def _render_chips(self):
+        for chip in self.chips.winfo_children():
+            chip.destroy()
+        for genre in self.genres:
+            ctk.CTkButton(self.chips, text=f"{genre} \u2715", width=0, fg_color="#4482b8", hover_color="#24496b",
+                          command=lambda genre=genre: self._remove_genre(genre)).pack(side="left", padx=2)
+
+    def _changed(self):
+        self._render_chips()
+        self.on_change()
+
+    def facets(self):
+        # Only the filters that are set, as find_filtered / AnimeInfo.matches keywords
+        facets = {}
+        if self.genres:
+            facets['genres'] = list(self.genres)
+        if self.season_menu.get() != self.ANY_SEASON:
+            facets['season'] = self.season_menu.get()
+        if self.year_from_menu.get() != self.ANY_YEAR:
+            facets['year_from'] = int(self.year_from_menu.get())
+        if self.year_to_menu.get() != self.ANY_YEAR:
+            facets['year_to'] = int(self.year_to_menu.get())
+        return facets
+
+
+class AnalyticsWindow(ctk.CTkToplevel):
+    def __init__(self, parent, on_refresh):
+        super().__init__(parent)
+        self.title("Statistics")
+        self.geometry("900x700")
+
+        self.refresh_button = ctk.CTkButton(self, text="Refresh", command=on_refresh,
+                                            fg_color="#446d92", hover_color="#24496b")
+        self.refresh_button.pack(side="top", anchor="e", padx=10, pady=5)
+
+        self.text = ctk.CTkTextbox(self, font=("Courier", 13), wrap="none")
+        self.text.pack(side="top", fill="both", expand=True)
+
+    def show(self, text):
+        self.text.configure(state="normal")
+        self.text.delete("1.0", "end")
+        self.text.insert("1.0", text)
+        self.text.configure(state="disabled")
+
+
+class SyncStatusBar(ctk.CTkFrame):
+    def __init__(self, parent, on_cancel):
+        super().__init__(parent, fg_color="#071f35", corner_radius=0)
+
+        self.label = ctk.CTkLabel(self, text="Starting sync", text_color="white", anchor="w")
+        self.label.pack(side="left", padx=10)
+
+        self.cancel_button = ctk.CTkButton(self, text="Cancel", width=80, command=on_cancel,
+                                           fg_color="#446d92", hover_color="#24496b")
+        self.cancel_button.pack(side="right", padx=10)
+
+        self.progress = ctk.CTkProgressBar(self, mode="indeterminate")
+        self.progress.pack(side="right", fill="x", expand=True, padx=10)
+        self.progress.start()
+
+    def update_progress(self, stage, done, total):
+        if total:
+            if self.progress.cget("mode") != "determinate":
+                self.progress.stop()
+                self.progress.configure(mode="determinate")
+            self.progress.set(done / total)
+            self.label.configure(text=f"{stage} ({done}/{total})")
+        else:
+            if self.progress.cget("mode") != "indeterminate":
+                self.progress.configure(mode="indeterminate")
+                self.progress.start()
+            self.label.configure(text=stage)
+
+
 class App(ctk.CTk):
+    SYNC_POLL_MS = 100
+    SYNC_BATCH = 200  # events handled per poll, so a burst can't stall the UI
+    SYNC_JOIN_TIMEOUT = 5  # seconds to wait for a cancelled sync on close
+    STATS_POLL_MS = 50
+    WRITE_POLL_MS = 100
+
     def __init__(self):
         super().__init__()
 
+        # Covers decode on worker threads and are polled in from here
+        covers.attach(self)
+
         # App Frame
         self.title("Tier List")
         self.geometry("1280x880")
 
+        self.search_matches = None
+        self.search_bar = SearchBar(self, on_search=self.search)
+        self.search_bar.place(relx=0, rely=0, relwidth=0.35, relheight=0.04)
+
+        self.filter_bar = FilterBar(self, on_change=self.apply_filters)
+        self.filter_bar.place(relx=0.35, rely=0, relwidth=0.57, relheight=0.04)
+
+        self.stats_button = ctk.CTkButton(self, text="Stats", command=self.open_stats,
+                                          fg_color="#446d92", hover_color="#24496b")
+        self.stats_button.place(relx=0.925, rely=0.004, relwidth=0.07, relheight=0.032)
+        self.stats_window = None
+        self.rating_stats = None
+        # One thread, so the stats always read through the same connection
+        self.stats_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analytics")
+        # The filter options come from a scan of every stored record, so they are
+        # read on the same thread and filled in once ready
+        future = self.stats_executor.submit(lambda: (client.info_store.genre_names() | db.genre_names(),
+                                                     client.info_store.years()))
+        self.after(self.STATS_POLL_MS, self._poll_filter_options, future)
+
         self.top_frame = TopFrame(self)
-        self.top_frame.place(relx=0, rely=0, relwidth=1, relheight=0.82)
+        self.top_frame.place(relx=0, rely=0.04, relwidth=1, relheight=0.78)
 
 
         self.bottom_frame = BottomFrame(self)
         self.bottom_frame.place(relx=0, rely=0.82, relwidth=1, relheight=0.18)
 
+        self.sync_worker = None
+        self.status_bar = None
+
+        self.write_events = queue.Queue()
+        self.writer = DBWriter(db, self.write_events)
+        self.writer.start()
+        self.after(self.WRITE_POLL_MS, self._poll_writes)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Ctrl+R re-reads the tier config and moves every rating to its new tier
+        self.bind("<Control-r>", lambda event: self.reload_tiers())
+
+    def search(self, text):
+        with metrics.span('search'):
+            self.search_matches = db.search(text)
+            self.apply_filters()
+        logger.debug("Search %r matched %s titles", text,
+                     'all' if self.search_matches is None else len(self.search_matches))
+
+    def apply_filters(self):
+        matches, facets = self.search_matches, self.filter_bar.facets()
+        if facets:
+            # Rated rows are narrowed on the genre/season indexes, the pool in memory
+            filtered = {row['song_title'] for row in db.find_filtered(**facets)}
+            top_matches = filtered if matches is None else matches & filtered
+        else:
+            top_matches = matches
+        for tier_frame in self.top_frame.tier_frames.values():
+            tier_frame.button_frame.set_matches(top_matches)
+        self.bottom_frame.set_matches(matches, facets)
+
+    def _poll_writes(self):
+        failures = []
+        while True:
+            try:
+                kind, (item, opening, preview), payload = self.write_events.get_nowait()
+            except queue.Empty:
+                break
+
+            preview_frame = self.top_frame.tier_frames[preview['tier']].button_frame
+            if kind == 'saved':
+                if payload['tier'] == preview['tier']:
+                    preview['id'] = payload['id']
+                elif preview_frame.remove_result(preview):
+                    # Re-tiered while the write was queued
+                    self.top_frame.tier_frames[payload['tier']].button_frame.insert_result(payload)
+            else:
+                preview_frame.remove_result(preview)
+                self.bottom_frame.restore_opening(item, opening)
+                failures.append(f"{opening.title}: {payload}")
+
+        if failures:
+            messagebox.showerror("Rating not saved", "\n".join(failures), parent=self)
+        self.after(self.WRITE_POLL_MS, self._poll_writes)
+
+    def on_close(self):
+        # Stop a running sync so it isn't killed halfway through a write, then let
+        # queued ratings reach the database before the window goes away
+        if self.sync_worker is not None and self.sync_worker.is_alive():
+            self.sync_worker.cancel()
+            self.sync_worker.join(self.SYNC_JOIN_TIMEOUT)
+        self.writer.close()
+        self.destroy()
+
+    def open_stats(self):
+        if self.rating_stats is None:
+            # numpy is only imported once the view is first opened, keeping it off startup
+            from analytics import RatingStats
+            self.rating_stats = RatingStats(db)
+        if self.stats_window is None or not self.stats_window.winfo_exists():
+            self.stats_window = AnalyticsWindow(self, on_refresh=self.refresh_stats)
+        self.stats_window.lift()
+        self.refresh_stats()
+
+    def refresh_stats(self):
+        from analytics import format_stats
+        self.stats_window.show("Computing statistics...")
+        future = self.stats_executor.submit(lambda: format_stats(self.rating_stats.stats()))
+        self.after(self.STATS_POLL_MS, self._poll_stats, future)
+
+    def _poll_stats(self, future):
+        if not future.done():
+            self.after(self.STATS_POLL_MS, self._poll_stats, future)
+            return
+        if self.stats_window is None or not self.stats_window.winfo_exists():
+            return
+        try:
+            self.stats_window.show(future.result())
+        except Exception as e:
+            logger.error(f"Error computing statistics: {e}")
+            self.stats_window.show(f"Could not compute statistics: {e}")
+
+    def _poll_filter_options(self, future):
+        if not future.done():
+            self.after(self.STATS_POLL_MS, self._poll_filter_options, future)
+            return
+        try:
+            self.filter_bar.add_options(*future.result())
+        except Exception as e:
+            logger.error(f"Error loading filter options: {e}")
+
+    def reload_tiers(self):
+        try:
+            tiers = TierConfig.load()
+        except (IOError, ValueError) as e:
+            # ValueError covers both malformed JSON and a rejected config
+            logger.error(f"Tier config not loaded: {e}")
+            messagebox.showerror("Tier config not loaded", str(e), parent=self)
+            return
+        self.retier(tiers)
 
+    def retier(self, tiers=None):
+        if db.retier(tiers) is None:
+            return
+        # One rebuild per tier row once the whole table has been rewritten
+        for tier, tier_frame in self.top_frame.tier_frames.items():
+            button_frame = tier_frame.button_frame
+            button_frame.create_image_buttons(tier, button_frame.fgcolor)
+
+    def start_sync(self):
+        self.sync_events = queue.Queue()
+        self.sync_worker = SyncWorker(client, self.sync_events, db)
+
+        self.status_bar = SyncStatusBar(self, on_cancel=self.cancel_sync)
+        self.bottom_frame.place_configure(relheight=0.14)
+        self.status_bar.place(relx=0, rely=0.96, relwidth=1, relheight=0.04)
+
+        self.sync_worker.start()
+        self.after(self.SYNC_POLL_MS, self._poll_sync)
+
+    def cancel_sync(self):
+        self.status_bar.cancel_button.configure(state="disabled", text="Cancelling")
+        self.sync_worker.cancel()
+
+    def _poll_sync(self):
+        new_anime = []
+        finished = None
+        for _ in range(self.SYNC_BATCH):
+            try:
+                event = self.sync_events.get_nowait()
+            except queue.Empty:
+                break
+
+            if event[0] == 'progress':
+                self.status_bar.update_progress(*event[1:])
+            elif event[0] == 'anime':
+                new_anime.append(event[1])
+            elif event[0] == 'done':
+                finished = event[1]
+
+        if new_anime:
+            self.bottom_frame.add_anime(new_anime)
+            infos = list(filter(None, map(client.get_info, new_anime)))
+            self.filter_bar.add_options({genre for info in infos for genre in info.genres},
+                                        {info.year for info in infos if info.year})
+
+        if finished is None:
+            self.after(self.SYNC_POLL_MS, self._poll_sync)
+            return
 
-if client.is_valid_token():
-    client.get_mal_list()
-    client.download_images()
-    client.get_anime_info()
+        logger.info(f"{finished} after {perf_counter() - started:.2f}s")
+        self.status_bar.destroy()
+        self.status_bar = None
+        self.bottom_frame.place_configure(relheight=0.18)
+
+
+# "background" opens the window from the local cache and syncs behind it,
+# "blocking" finishes the MAL sync before the window is built
+SYNC_MODE = os.getenv('TIERLIST_SYNC_MODE', 'background')
+
+if __name__ == '__main__':
+    metrics.configure_from_env()
+    if SYNC_MODE == 'blocking':
+        if client.is_valid_token():
+            diff = client.get_mal_list()
+            client.download_images(diff)
+            client.get_anime_info(diff)
+            logger.info("MAL Initialization Finished")
+        else:
+            logger.warning("Invalid access token")
     client.cache_info()
-    logger.info("MAL Initialization Finished")
-else:
-    logger.warning("Invalid access token")
-app = App()
-app.mainloop()
\ No newline at end of file
+    # First run indexes every cached opening; later runs only load the anime
+    # that have no search rows yet
+    threading.Thread(target=lambda: db.index_openings(
+                         filter(None, map(client.get_info, client.info_store.ids() - db.indexed_anime()))),
+                     name="search-index", daemon=True).start()
+
+    app = App()
+    app.after(0, lambda: logger.info(f"Time to first frame: {perf_counter() - started:.3f}s ({SYNC_MODE} sync)"))
+    if SYNC_MODE != 'blocking':
+        app.start_sync()
+    app.mainloop()
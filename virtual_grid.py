@@ -0,0 +1,191 @@
+import math
+import tkinter as tk
+import customtkinter as ctk
+
+
+class VirtualGrid(ctk.CTkFrame):
+    def __init__(self, parent, bind_cell, fg_color, cell_size=(110, 154), orientation="vertical",
+                 max_per_row=None, overscan=1, button_kwargs=None):
+        super().__init__(parent, fg_color=fg_color, corner_radius=0)
+        self.bind_cell = bind_cell
+        self.cell_w, self.cell_h = cell_size
+        self.horizontal = orientation == "horizontal"
+        self.max_per_row = max_per_row
+        self.overscan = overscan
+        self.button_kwargs = button_kwargs or {}
+
+        self.all_items = []
+        self.items = []  # the filtered view that is actually laid out
+        self._filter = None
+        self.columns = 1
+        self._bound = {}  # item index -> (canvas window id, button)
+        self._free = []   # recycled (canvas window id, button) pairs
+
+        self.canvas = tk.Canvas(self, highlightthickness=0, bg=fg_color,
+                                xscrollincrement=self.cell_w, yscrollincrement=self.cell_h // 3)
+        if self.horizontal:
+            self.scrollbar = tk.Scrollbar(self, orient="horizontal", command=self.canvas.xview)
+            self.canvas.configure(xscrollcommand=self._on_view_changed)
+            self.scrollbar.pack(side="bottom", fill="x")
+        else:
+            self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self.canvas.yview)
+            self.canvas.configure(yscrollcommand=self._on_view_changed)
+            self.scrollbar.pack(side="right", fill="y")
+        self.canvas.pack(side="top", fill="both", expand=True)
+
+        self.canvas.bind("<Configure>", lambda event: self._layout())
+        self.bind_all("<MouseWheel>", self._on_mousewheel, add="+")
+        self.bind_all("<Button-4>", self._on_mousewheel, add="+")
+        self.bind_all("<Button-5>", self._on_mousewheel, add="+")
+
+    def set_items(self, items):
+        self.all_items = list(items)
+        self._apply_filter()
+
+    def set_filter(self, predicate):
+        # None shows everything; otherwise only items the predicate accepts are laid out
+        self._filter = predicate
+        self._apply_filter()
+        if self.horizontal:
+            self.canvas.xview_moveto(0)
+        else:
+            self.canvas.yview_moveto(0)
+
+    def _matches(self, item):
+        return self._filter is None or self._filter(item)
+
+    def _apply_filter(self):
+        self.items = [item for item in self.all_items if self._matches(item)]
+        self._release_all()
+        self._layout()
+
+    def extend_items(self, items):
+        items = list(items)
+        start = len(self.items)
+        self.all_items.extend(items)
+        self.items.extend(item for item in items if self._matches(item))
+        self._shift_from(start)
+
+    def insert_item(self, index, item):
+        # index is a position in all_items; the view keeps the same relative order
+        self.all_items.insert(index, item)
+        if not self._matches(item):
+            return
+        view_index = index if self._filter is None else sum(map(self._matches, self.all_items[:index]))
+        self.items.insert(view_index, item)
+        self._shift_from(view_index)
+
+    def remove_item(self, item):
+        index = next((i for i, existing in enumerate(self.all_items) if existing is item), None)
+        if index is None:
+            return False
+        del self.all_items[index]
+        view_index = next((i for i, existing in enumerate(self.items) if existing is item), None)
+        if view_index is not None:
+            del self.items[view_index]
+            self._shift_from(view_index)
+        return True
+
+    def _shift_from(self, index):
+        # Cells before index keep their widgets; everything after moved by one slot
+        for bound_index in [i for i in self._bound if i >= index]:
+            self._release(bound_index)
+        self._update_scrollregion()
+        self._render()
+
+    def _release_all(self):
+        for index in list(self._bound):
+            self._release(index)
+
+    def _release(self, index):
+        window_id, button = self._bound.pop(index)
+        self.canvas.itemconfigure(window_id, state="hidden")
+        self._free.append((window_id, button))
+
+    def _acquire(self):
+        if self._free:
+            return self._free.pop()
+        button = ctk.CTkButton(self.canvas, text="", width=self.cell_w - 2, height=self.cell_h - 2,
+                               **self.button_kwargs)
+        window_id = self.canvas.create_window(0, 0, window=button, anchor="nw")
+        return window_id, button
+
+    def _cell_origin(self, index):
+        if self.horizontal:
+            return index * self.cell_w, 0
+        row, col = divmod(index, self.columns)
+        # Center the grid the way a weighted grid layout would
+        offset = max(0, (self.canvas.winfo_width() - self.columns * self.cell_w) // 2)
+        return offset + col * self.cell_w, row * self.cell_h
+
+    def _update_scrollregion(self):
+        count = len(self.items)
+        if self.horizontal:
+            width, height = count * self.cell_w, self.cell_h
+        else:
+            width = self.canvas.winfo_width()
+            height = math.ceil(count / self.columns) * self.cell_h
+        self.canvas.configure(scrollregion=(0, 0, width, height))
+
+    def _layout(self):
+        if not self.horizontal:
+            self.columns = max(1, self.canvas.winfo_width() // self.cell_w)
+            if self.max_per_row:
+                self.columns = min(self.columns, self.max_per_row)
+
+        self._update_scrollregion()
+        # Positions depend on the column count, so rebind whatever is on screen
+        self._release_all()
+        self._render()
+
+    def _visible_range(self, overscan=None):
+        overscan = self.overscan if overscan is None else overscan
+        if self.horizontal:
+            start = self.canvas.canvasx(0)
+            extent = self.canvas.winfo_width()
+            first = int(start // self.cell_w) - overscan
+            last = int((start + extent) // self.cell_w) + 1 + overscan
+        else:
+            start = self.canvas.canvasy(0)
+            extent = self.canvas.winfo_height()
+            first_row = int(start // self.cell_h) - overscan
+            last_row = int((start + extent) // self.cell_h) + 1 + overscan
+            first, last = first_row * self.columns, last_row * self.columns
+        return max(0, first), min(len(self.items), last)
+
+    def _render(self):
+        first, last = self._visible_range()
+
+        for index in [index for index in self._bound if not first <= index < last]:
+            self._release(index)
+
+        # Cells on screen are bound before the overscan margin, so anything
+        # bind_cell queues up (cover loads) starts with what the user can see
+        on_screen = range(*self._visible_range(overscan=0))
+        margin = [index for index in range(first, last) if index not in on_screen]
+        for index in [*on_screen, *margin]:
+            if index in self._bound:
+                continue
+            window_id, button = self._acquire()
+            self.bind_cell(button, self.items[index])
+            self.canvas.coords(window_id, *self._cell_origin(index))
+            self.canvas.itemconfigure(window_id, state="normal")
+            self._bound[index] = (window_id, button)
+
+    def _on_view_changed(self, first, last):
+        self.scrollbar.set(first, last)
+        self._render()
+
+    def _on_mousewheel(self, event):
+        # bind_all delivers every wheel event, so only react to ones over this grid
+        widget, canvas = str(event.widget), str(self.canvas)
+        if widget != canvas and not widget.startswith(canvas + "."):
+            return
+        if event.num == 4 or event.delta > 0:
+            step = -1
+        else:
+            step = 1
+        if self.horizontal:
+            self.canvas.xview_scroll(step, "units")
+        else:
+            self.canvas.yview_scroll(step, "units")